@@ -1,48 +1,83 @@
-import os
-import uvicorn
+import json
+import time
+import asyncio
+from typing import Optional
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from dotenv import load_dotenv
 
 from app.core.config import load_params
 from app.services.chatbot import Chatbot
-from app.core.logger import setup_logger
+from app.services.app_context import AppContext
+from app.services.admission import AdmissionRejected
+from app.core.logger import setup_logger, start_log_listener, stop_log_listener
+from app.api.middleware import RequestIdMiddleware
 from app.core.exception import AppException
-from app.db.mango_database import AsyncMongoDatabase
+from app.core.deadline import DeadlineExceeded
+from app.core import metrics
 
-load_dotenv()
+PARAMS_PATH = "config/params.yaml"
 
-# LangSmith tracing
-os.environ["LANGCHAIN_API_KEY"] = os.getenv("LANGCHAIN_API_KEY")
-os.environ["LANGCHAIN_PROJECT"] = os.getenv("LANGCHAIN_PROJECT")
-os.environ["LANGCHAIN_TRACING_V2"] = "true"
+# Start-up and shutdown messages, logged before the context and its loggers exist
+logger = setup_logger("FastAPI", "fastapi.log")
 
-# Load config and logger
-params = load_params("config/params.yaml")
-main_params = params.get("main", {})
-main_log_file_path = main_params.get("fastapi_log_file_path", "fastapi.log")
-logger = setup_logger("FastAPI", main_log_file_path)
 
-#  Initialize MongoDB instance
-mongo = AsyncMongoDatabase()
+async def _start_context(app: FastAPI) -> None:
+    """Build and start the shared ``AppContext``, then mark the app ready."""
+    started = time.perf_counter()
+    try:
+        if getattr(app.state, "context", None) is None:
+            # On a worker thread: importing and building the clients must not stall the event loop
+            app.state.context = await asyncio.to_thread(AppContext.from_config, PARAMS_PATH)
+        logger.info("MongoDB client initialized and ready.")
+        await app.state.context.start()
+    except Exception as e:
+        app.state.startup_error = e
+        logger.exception("App startup failed: %s", e)
+        raise
+    app.state.ready = True
+    logger.info("App ready after %.2fs.", time.perf_counter() - started)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Lifespan event handler for startup and shutdown."""
+    """
+    Lifespan event handler for startup and shutdown.
+
+    Builds the shared ``AppContext`` (unless one was set on ``app.state``
+    beforehand, e.g. by a benchmark) and closes it on shutdown. With
+    ``fastapi.background_startup`` the server starts answering ``/health``
+    at once and the context is built in the background; ``/ready`` reports
+    when it can take traffic.
+    """
     # Startup
+    start_log_listener()
     logger.info("App starting up...")
-    # Motor connects lazily, so we just ensure client exists
-    if mongo.client is None:
-        mongo.client  # create client
-    logger.info("MongoDB client initialized and ready.")
-    
+    app.state.ready = False
+    app.state.startup_error = None
+    startup = asyncio.ensure_future(_start_context(app))
+    if not load_params(PARAMS_PATH).get("fastapi", {}).get("background_startup", True):
+        await startup
+
     yield  # App runs here
-    
+
     # Shutdown
-    await mongo.close_connection()
+    if not startup.done():
+        startup.cancel()
+    await asyncio.gather(startup, return_exceptions=True)
+    if getattr(app.state, "context", None) is not None:
+        await app.state.context.close()
     logger.info("App shutting down. MongoDB connection closed.")
+    # Writes out any log records still queued
+    stop_log_listener()
+
+
+def get_context(request: Request) -> AppContext:
+    """FastAPI dependency returning the worker's shared application context (503 until it is ready)."""
+    if not request.app.state.ready:
+        raise HTTPException(status_code=503, detail="Service is starting up.", headers={"Retry-After": "1"})
+    return request.app.state.context
 
 
 # FastAPI App
@@ -52,6 +87,7 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan,
 )
+app.add_middleware(RequestIdMiddleware)
 
 
 class ChatRequest(BaseModel):
@@ -59,36 +95,181 @@ class ChatRequest(BaseModel):
     question: str = Field(..., min_length=1)
     model: str = Field(default="gemini-2.5-flash")
     session_id: str
+    timeout_seconds: Optional[float] = Field(default=None, gt=0)
 
 
 @app.get("/")
-async def home() -> dict:
+async def home(context: AppContext = Depends(get_context)) -> dict:
     """Health check endpoint."""
-    logger.info("Root endpoint accessed.")
+    context.api_logger.info("Root endpoint accessed.")
     return {"message": "Async LLM Chatbot API running successfully "}
 
 
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
+    """Liveness probe: answers as soon as the server runs, unless startup has failed."""
+    if request.app.state.startup_error is not None:
+        raise HTTPException(status_code=503, detail="Startup failed.")
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """Readiness probe: 200 once MongoDB and the LLM clients are set up, 503 before that."""
+    if not request.app.state.ready:
+        raise HTTPException(status_code=503, detail="Service is starting up.")
+    return {"status": "ready"}
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    """Prometheus metrics: stage and MongoDB latencies, pool usage, in-flight LLM calls, loop lag."""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/cache/stats")
+async def cache_stats(context: AppContext = Depends(get_context)) -> dict:
+    """Response cache hit/miss counters for this worker."""
+    response_cache, semantic_cache = context.response_cache, context.semantic_cache
+    return {
+        "exact": response_cache.stats() if response_cache else {"enabled": False},
+        "semantic": semantic_cache.stats() if semantic_cache else {"enabled": False},
+    }
+
+
+@app.get("/admission/stats")
+async def admission_stats(context: AppContext = Depends(get_context)) -> dict:
+    """Outbound LLM call concurrency and queue depth for this worker."""
+    return context.admission.stats()
+
+
+@app.get("/resilience/stats")
+async def resilience_stats(context: AppContext = Depends(get_context)) -> dict:
+    """Retry, hedging and circuit breaker state for outbound LLM calls."""
+    return context.resilience.stats()
+
+
+@app.get("/router/stats")
+async def router_stats(context: AppContext = Depends(get_context)) -> dict:
+    """Live per-model health used for fallback routing."""
+    model_router = context.model_router
+    return model_router.stats() if model_router else {"enabled": False}
+
+
+async def _until_disconnected(context: AppContext, http_request: Request, task: asyncio.Task):
+    """
+    Await ``task``, cancelling it if the client goes away first.
+
+    Raises:
+        HTTPException: 499 if the client disconnected before the task finished.
+    """
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=context.disconnect_poll_seconds)
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            task.cancel()
+            context.api_logger.info("Client disconnected; cancelled in-flight chat request.")
+            raise HTTPException(status_code=499, detail="Client closed request.")
+
+
+def _log_app_exception(context: AppContext, e: AppException) -> None:
+    """Log server-side failures; the message is only formatted if the record is written."""
+    if e.status_code >= 500:
+        # Logged with the wrapped error's traceback, i.e. where the failure was raised
+        error = e.error if isinstance(e.error, BaseException) else e
+        context.api_logger.error(
+            f"Chat request failed with {type(e).__name__}: %s", e,
+            exc_info=(type(error), error, e._traceback),
+        )
+
+
 @app.post("/chat")
-async def chat(request: ChatRequest) -> dict:
-    """Async chat endpoint."""
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+    http_response: Response,
+    context: AppContext = Depends(get_context),
+) -> dict:
+    """Async chat endpoint. Per-stage timings are returned in the ``Server-Timing`` header."""
     try:
-        chatbot = Chatbot(request.model, request.question, request.session_id)
-        response = await chatbot.generate_response()
-        return {"model": request.model, "response": response}
+        chatbot = Chatbot(
+            context, request.model, request.question, request.session_id,
+            deadline=context.new_deadline(request.timeout_seconds),
+        )
+        task = asyncio.ensure_future(chatbot.generate_response())
+        try:
+            response = await _until_disconnected(context, http_request, task)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        http_response.headers["Server-Timing"] = chatbot.timings.server_timing()
+        return {"model": chatbot.model, "response": response}
 
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except AppException as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        _log_app_exception(context, e)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception("Unexpected server error: %s", e)
+        context.api_logger.exception("Unexpected server error: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error.")
 
 
+def _sse_event(data: dict, event: str = None) -> str:
+    """Format a payload as a single server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, context: AppContext = Depends(get_context)) -> StreamingResponse:
+    """Stream the chatbot response as server-sent events."""
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty.")
+    try:
+        context.check_model(request.model)
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    chatbot = Chatbot(
+        context, request.model, request.question, request.session_id,
+        deadline=context.new_deadline(request.timeout_seconds),
+    )
+
+    async def event_stream():
+        try:
+            async for token in chatbot.stream_response():
+                yield _sse_event({"token": token})
+            yield _sse_event({"model": chatbot.model, "timings_ms": chatbot.timings.as_millis()}, event="done")
+        except AdmissionRejected as e:
+            yield _sse_event({"detail": str(e), "status": e.status_code}, event="error")
+        except DeadlineExceeded as e:
+            yield _sse_event({"detail": str(e), "status": 504}, event="error")
+        except AppException as e:
+            _log_app_exception(context, e)
+            yield _sse_event({"detail": e.detail, "status": e.status_code}, event="error")
+        except Exception as e:
+            context.api_logger.exception("Unexpected server error while streaming: %s", e)
+            yield _sse_event({"detail": "Internal server error."}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("app.api.fastapi_app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,49 @@
+import re
+import uuid
+
+from app.core.logger import request_id_var
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Incoming ids are reused only if they are short and safe to log
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestIdMiddleware:
+    """
+    Assigns every HTTP request an id for log correlation.
+
+    The id is taken from the ``X-Request-ID`` header when the caller (or a
+    load balancer) sent a valid one, generated otherwise, stored in
+    ``request_id_var`` for the duration of the request and echoed back in the
+    response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == REQUEST_ID_HEADER:
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER, request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
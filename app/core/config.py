@@ -2,15 +2,20 @@ import os
 import sys
 import yaml
 import logging
+from functools import lru_cache
 
 from app.core.exception import AppException
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=None)
 def load_params(params_path: str) -> dict:
     """
     Load application configuration parameters from a YAML file.
 
+    Each file is read and parsed once per process; later calls return the
+    same dictionary, which callers must treat as read-only.
+
     Args:
         params_path (str): Path to the YAML configuration file.
 
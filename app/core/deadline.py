@@ -0,0 +1,63 @@
+import time
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of its time budget."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded during {stage}.")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    End-to-end time budget of a single request.
+
+    The budget is split across stages by fraction: a stage may use at most
+    ``fraction * total`` seconds and never more than what is left overall, so
+    a slow early stage eats into later ones instead of extending the request.
+    """
+
+    def __init__(self, total_seconds: float, stage_fractions: Optional[dict] = None):
+        self.total_seconds = total_seconds
+        self.stage_fractions = stage_fractions or {}
+        self.expires_at = time.monotonic() + total_seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def budget(self, stage: str) -> float:
+        """Seconds the given stage may use."""
+        fraction = self.stage_fractions.get(stage, 1.0)
+        return min(self.remaining(), self.total_seconds * fraction)
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded if the budget is already spent."""
+        if self.expired:
+            raise DeadlineExceeded(stage)
+
+    def stage_expires_at(self, stage: str) -> float:
+        """Monotonic time by which the given stage, starting now, must finish."""
+        return time.monotonic() + self.budget(stage)
+
+    async def run(self, stage: str, awaitable: Awaitable[T], expires_at: Optional[float] = None) -> T:
+        """
+        Await ``awaitable`` within the stage budget, cancelling it on timeout.
+
+        A stage spread over several awaits (e.g. the chunks of a stream) passes
+        the ``expires_at`` it got from ``stage_expires_at`` so the awaits share
+        one budget instead of each getting a fresh one.
+        """
+        timeout = self.budget(stage) if expires_at is None else max(0.0, expires_at - time.monotonic())
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(stage)
@@ -1,50 +1,59 @@
 import sys
-import logging
+from types import TracebackType
+from typing import Optional
 
-def error_message_detail(error: Exception, error_detail: sys) -> str:
-    """
-    Extract detailed error information including file name, line number, and the error message.
-
-    Args:
-        error (Exception): The exception that occurred.
-        error_detail (sys): The sys module to access traceback details.
-
-    Returns:
-        str: Formatted error message string.
-    """
-    # Get traceback details safely
-    exc_type, exc_value, exc_tb = error_detail.exc_info()
 
+def _format_error(error, exc_tb: Optional[TracebackType]) -> str:
     if exc_tb is not None:
-        file_name = exc_tb.tb_frame.f_code.co_filename
-        line_number = exc_tb.tb_lineno
-        error_message = (
-            f"Error occurred in file: [{file_name}] "
-            f"at line number [{line_number}] "
+        return (
+            f"Error occurred in file: [{exc_tb.tb_frame.f_code.co_filename}] "
+            f"at line number [{exc_tb.tb_lineno}] "
             f"with error: {str(error)}"
         )
-    else:
-        error_message = f"Error occurred: {str(error)} (no traceback available)"
-
-    logging.error(error_message)
-    return error_message
+    return f"Error occurred: {str(error)} (no traceback available)"
 
 
 class AppException(Exception):
     """
     Custom application-level exception for standardized error handling.
+
+    Construction is cheap: the original error and traceback are kept as they
+    are and only formatted when the message is read, and nothing is logged
+    here; the code that handles the exception decides whether to log it.
+    ``status_code`` is the HTTP status the API answers with.
     """
 
-    def __init__(self, error_message: str, error_detail: sys):
+    status_code = 500
+
+    def __init__(self, error_message, error_detail: sys = sys):
         """
-        Initialize the AppException with a detailed error message.
+        Initialize the AppException with the error it wraps.
 
         Args:
-            error_message (str): A string describing the error.
+            error_message (str | Exception): A string describing the error, or the exception being wrapped.
             error_detail (sys): The sys module to access traceback details.
         """
         super().__init__(error_message)
-        self.error_message = error_message_detail(error_message, error_detail)
+        if isinstance(error_message, AppException):
+            # Re-wrapping keeps the original error, where it was raised and, unless narrowed, its status
+            self.error, self._traceback = error_message.error, error_message._traceback
+            if type(self) is AppException:
+                self.status_code = error_message.status_code
+        else:
+            self.error, self._traceback = error_message, error_detail.exc_info()[2]
+        self._error_message = None
+
+    @property
+    def error_message(self) -> str:
+        """The error with the file and line it was raised at, formatted on first use."""
+        if self._error_message is None:
+            self._error_message = _format_error(self.error, self._traceback)
+        return self._error_message
+
+    @property
+    def detail(self) -> str:
+        """Short message for API clients, without file paths."""
+        return str(self.error)
 
     def __str__(self) -> str:
         """Return a clean, human-readable string representation."""
@@ -52,4 +61,22 @@ class AppException(Exception):
 
     def __repr__(self) -> str:
         """Return an unambiguous developer-friendly representation."""
-        return f"{self.__class__.__name__}({self.error_message})"
\ No newline at end of file
+        return f"{self.__class__.__name__}({self.error_message})"
+
+
+class ClientError(AppException):
+    """The request itself is invalid (e.g. an empty question)."""
+
+    status_code = 400
+
+
+class ProviderError(AppException):
+    """The LLM provider failed or could not be reached."""
+
+    status_code = 502
+
+
+class DatabaseError(AppException):
+    """MongoDB failed or could not be reached."""
+
+    status_code = 503
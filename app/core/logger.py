@@ -1,10 +1,224 @@
 import os
+import json
+import time
+import zlib
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from app.core.config import load_params
 
 LOG_DIR = "logs"
 MAX_LOG_SIZE = 5 * 1024 * 1024  # 5 MB
 BACKUP_COUNT = 3  # Number of rotated logs to keep
+LOG_FORMAT = "%(asctime)s | %(name)s | %(levelname)s | %(message)s"
+
+try:
+    logging_params = load_params("config/params.yaml").get("logging", {})
+except FileNotFoundError:
+    logging_params = {}
+
+log_mode = logging_params.get("mode", "sync")
+log_format = logging_params.get("format", "text")
+sampling_params = logging_params.get("sampling", {})
+
+# Id of the request being handled, attached to every record logged while handling it
+request_id_var: ContextVar = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+# File handlers shared by every logger writing to the same file
+_file_handlers = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the request id and any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Runs in the thread that logs, before a record is queued or written.
+
+    Stamps the current request id on the record, samples INFO/DEBUG records
+    and suppresses repeats of the same error.
+
+    Sampling keeps a fraction of a logger's request records below WARNING
+    (per-logger ``rates``, else ``default_rate``). The decision is made per
+    request id, so a sampled request keeps all its lines; records logged
+    outside a request (start-up, shutdown, background work) are always kept.
+    An error with the same logger, rendered message and exception type as one
+    logged within ``dedup_window_seconds`` is dropped; the next one logged
+    after the window reports how many were suppressed.
+    """
+
+    def __init__(self, default_rate: float = 1.0, rates: dict = None, dedup_window_seconds: float = 60):
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.dedup_window_seconds = dedup_window_seconds
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def _sampled(self, record: logging.LogRecord) -> bool:
+        if not record.request_id:
+            return True
+        rate = self.rates.get(record.name, self.default_rate)
+        if rate >= 1:
+            return True
+        return zlib.crc32(record.request_id.encode("utf-8")) / 0xFFFFFFFF < rate
+
+    def _first_in_window(self, record: logging.LogRecord) -> bool:
+        exc_type = record.exc_info[0].__name__ if record.exc_info and record.exc_info[0] else None
+        # The rendered message: the same template can report different errors
+        key = (record.name, record.getMessage(), exc_type)
+        now = time.monotonic()
+        with self._lock:
+            first_seen, suppressed = self._errors.get(key, (None, 0))
+            if first_seen is not None and now - first_seen < self.dedup_window_seconds:
+                self._errors[key] = (first_seen, suppressed + 1)
+                return False
+            if len(self._errors) > 1000:
+                self._errors.clear()
+            self._errors[key] = (now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        if record.levelno < logging.WARNING:
+            return self._sampled(record)
+        if record.levelno >= logging.ERROR and self.dedup_window_seconds > 0:
+            return self._first_in_window(record)
+        return True
+
+
+_context_filter = ContextFilter(
+    default_rate=sampling_params.get("default_rate", 1.0),
+    rates=sampling_params.get("rates", {}),
+    dedup_window_seconds=logging_params.get("dedup_window_seconds", 60),
+)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to a bounded queue without ever blocking the caller.
+
+    When the queue is full the record is dropped (``drop_new``) or the oldest
+    queued record makes room for it (``drop_oldest``); either way ``dropped``
+    is incremented. Formatting is left to the listener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue, drop_policy: str = "drop_new"):
+        super().__init__(log_queue)
+        self.drop_policy = drop_policy
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            self.dropped += 1
+
+        if self.drop_policy == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+
+
+class _RoutingHandler(logging.Handler):
+    """Runs on the listener thread and passes each record to its logger's own handlers."""
+
+    def __init__(self):
+        super().__init__()
+        self.routes = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        for handler in self.routes.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Blocking put: the stop signal must not be lost to a full queue
+        self.queue.put(self._sentinel)
+
+
+_router = _RoutingHandler()
+_queue_handler = DroppingQueueHandler(
+    queue.Queue(maxsize=logging_params.get("queue_size", 10000)),
+    drop_policy=logging_params.get("drop_policy", "drop_new"),
+)
+_queue_handler.addFilter(_context_filter)
+_listener = None
+
+
+def start_log_listener() -> None:
+    """Start writing queued log records on a background thread (no-op if running or in sync mode)."""
+    global _listener
+    if log_mode != "queue" or _listener is not None:
+        return
+    _listener = _Listener(_queue_handler.queue, _router)
+    _listener.start()
+
+
+def stop_log_listener() -> None:
+    """Write out every queued record and stop the background thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    if _queue_handler.dropped:
+        logging.getLogger(__name__).warning("%d log record(s) were dropped because the log queue was full.",
+                                            _queue_handler.dropped)
+
+
+def dropped_log_records() -> int:
+    return _queue_handler.dropped
+
+
+atexit.register(stop_log_listener)
+
+
+def _file_handler(log_file_path: str, formatter: logging.Formatter) -> logging.Handler:
+    handler = _file_handlers.get(log_file_path)
+    if handler is None:
+        # File Handler with rotation --> keeps logs manageable
+        handler = RotatingFileHandler(
+            log_file_path, maxBytes=MAX_LOG_SIZE, backupCount=BACKUP_COUNT, encoding="utf-8"
+        )
+        handler.setFormatter(formatter)
+        handler.setLevel(logging.DEBUG)
+        _file_handlers[log_file_path] = handler
+    return handler
+
 
 def setup_logger(
     name: str = None,
@@ -14,11 +228,12 @@ def setup_logger(
     Creates and returns a logger instance with console + file handlers.
     Rotates logs automatically when file grows large.
 
+    In ``queue`` logging mode (``logging.mode`` in params.yaml) the logger
+    only enqueues records; formatting and writing happen on a listener thread.
+
     Args:
         name (str): Logger name (usually module name).
-        log_dir_path (str): Directory for log files.
         log_file_name (str): Log file name.
-        level (int): Logging level.
 
     Returns:
         logging.Logger: Configured logger instance.
@@ -27,7 +242,7 @@ def setup_logger(
     if not log_file_name:
         log_file_name = f"{__name__.replace('.', '_')}.log"
 
-    log_dir_path = os.path.join(os.getcwd(), LOG_DIR) 
+    log_dir_path = os.path.join(os.getcwd(), LOG_DIR)
     os.makedirs(log_dir_path, exist_ok=True)
     log_file_path = os.path.join(log_dir_path, log_file_name)
 
@@ -39,26 +254,25 @@ def setup_logger(
         return logger
 
     # Formatter
-    formatter = logging.Formatter(
-        "%(asctime)s | %(name)s | %(levelname)s | %(message)s"
-    )
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(LOG_FORMAT)
 
     # Console Handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
     console_handler.setLevel(logging.INFO)
 
-    # File Handler with rotation --> keeps logs manageable
-    file_handler = RotatingFileHandler(
-        log_file_path, maxBytes=MAX_LOG_SIZE, backupCount=BACKUP_COUNT, encoding="utf-8"
-    )
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.DEBUG)
+    file_handler = _file_handler(log_file_path, formatter)
 
     # Add handlers
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    if log_mode == "queue":
+        _router.routes[logger.name] = [console_handler, file_handler]
+        logger.addHandler(_queue_handler)
+        start_log_listener()
+    else:
+        logger.addFilter(_context_filter)
+        logger.addHandler(console_handler)
+        logger.addHandler(file_handler)
 
     logger.propagate = False
 
-    return logger
\ No newline at end of file
+    return logger
@@ -0,0 +1,134 @@
+import time
+import asyncio
+from contextlib import contextmanager
+from typing import Optional
+
+
+from app.core.config import load_params
+from app.core.logger import setup_logger
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+except ImportError:
+    CONTENT_TYPE_LATEST = Gauge = Histogram = generate_latest = None
+
+params = load_params("config/params.yaml")
+metrics_params = params.get("metrics", {})
+
+logger = setup_logger(name="Metrics", log_file_name="metrics.log")
+
+enabled = metrics_params.get("enabled", True) and Histogram is not None
+if metrics_params.get("enabled", True) and not enabled:
+    logger.warning("prometheus_client is not installed; metrics are disabled.")
+
+# Seconds; spans everything from a cache hit to a slow model call
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+
+
+class _NoopMetric:
+    """Stands in for every metric when metrics are disabled."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def set_function(self, fn) -> None:
+        pass
+
+
+def _histogram(name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+    if not enabled:
+        return _NoopMetric()
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+def _gauge(name: str, documentation: str, labelnames=()):
+    if not enabled:
+        return _NoopMetric()
+    return Gauge(name, documentation, labelnames)
+
+
+chat_stage_seconds = _histogram(
+    "chat_stage_seconds", "Time spent in each stage of a chat request.", ["stage"]
+)
+mongo_operation_seconds = _histogram(
+    "mongo_operation_seconds", "Duration of MongoDB operations.", ["operation"]
+)
+mongo_pool_connections = _gauge("mongo_pool_connections", "Open MongoDB pool connections.", ["address"])
+mongo_pool_checked_out = _gauge("mongo_pool_checked_out", "MongoDB connections currently in use.", ["address"])
+mongo_pool_wait_seconds = _histogram(
+    "mongo_pool_wait_seconds", "Time spent waiting to check a connection out of the MongoDB pool."
+)
+mongo_write_behind_queue = _gauge("mongo_write_behind_queue", "Chat turns waiting to be written to MongoDB.")
+llm_in_flight = _gauge("llm_in_flight", "Outbound LLM calls currently running.")
+llm_queued = _gauge("llm_queued", "LLM calls waiting for an admission slot.")
+event_loop_lag_seconds = _histogram(
+    "event_loop_lag_seconds", "How late the event loop runs a scheduled callback.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    chat_stage_seconds.labels(stage).observe(seconds)
+
+
+@contextmanager
+def mongo_operation(operation: str):
+    """Time the MongoDB operation performed inside the block."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        mongo_operation_seconds.labels(operation).observe(time.perf_counter() - started)
+
+
+class EventLoopLagMonitor:
+    """
+    Measures event loop lag: how much later than requested a sleep wakes up.
+
+    Sustained lag means blocking work on the loop thread or too little CPU
+    for the load.
+    """
+
+    def __init__(self, interval_seconds: float = 0.5):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval_seconds)
+            event_loop_lag_seconds.observe(max(0.0, loop.time() - started - self.interval_seconds))
+
+    def start(self) -> None:
+        if enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+loop_lag_monitor = EventLoopLagMonitor(metrics_params.get("loop_lag_interval_seconds", 0.5))
+
+
+def render() -> tuple:
+    """Return the current metrics in Prometheus text format, with their content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
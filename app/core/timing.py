@@ -0,0 +1,32 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from app.core import metrics
+
+
+class StageTimings:
+    """Wall-clock time spent in each stage of one request, also exported as metrics."""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        metrics.observe_stage(stage, seconds)
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Time the block as ``stage`` (added to any earlier time for the same stage)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def as_millis(self) -> Dict[str, float]:
+        return {stage: round(seconds * 1000, 1) for stage, seconds in self.durations.items()}
+
+    def server_timing(self) -> str:
+        """Format the timings as a ``Server-Timing`` header value."""
+        return ", ".join(f"{stage};dur={millis}" for stage, millis in self.as_millis().items())
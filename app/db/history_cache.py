@@ -0,0 +1,134 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class _CacheEntry:
+    """Recent turns of one session, oldest first."""
+
+    __slots__ = ("turns", "complete", "size", "expires_at")
+
+    def __init__(self, turns: List[Dict], complete: bool, expires_at: float):
+        self.turns = turns
+        self.complete = complete
+        self.size = sum(_turn_size(turn) for turn in turns)
+        self.expires_at = expires_at
+
+
+def _turn_size(turn: Dict) -> int:
+    """Approximate memory footprint of a cached turn in bytes."""
+    return (
+        sys.getsizeof(turn.get("user_input", ""))
+        + sys.getsizeof(turn.get("chatbot_response", ""))
+        + 64
+    )
+
+
+class SessionHistoryCache:
+    """
+    Bounded in-process LRU + TTL cache of recent chat turns per session.
+
+    Each entry keeps at most ``max_turns`` of a session's latest turns. An entry
+    is ``complete`` when it holds the session's entire history, so requests for
+    more turns than are cached can still be answered from memory. Entries
+    expire after ``ttl_seconds`` (bounding staleness when several workers write
+    the same session), and the least recently used sessions are evicted once
+    ``max_sessions`` or ``max_bytes`` is exceeded.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        max_turns: int = 20,
+        ttl_seconds: float = 300,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str, limit: int) -> Optional[List[Dict]]:
+        """Return the latest ``limit`` turns for a session, or None on a miss."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(session_id)
+            self.misses += 1
+            return None
+
+        if len(entry.turns) < limit and not entry.complete:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return entry.turns[-limit:] if limit > 0 else []
+
+    def put(self, session_id: str, turns: List[Dict], complete: bool) -> None:
+        """Store turns (oldest first) loaded from the database for a session."""
+        turns = list(turns)
+        if len(turns) > self.max_turns:
+            turns = turns[-self.max_turns:]
+            complete = False
+
+        self._remove(session_id)
+        entry = _CacheEntry(turns, complete, time.monotonic() + self.ttl_seconds)
+        self._entries[session_id] = entry
+        self._bytes += entry.size
+        self._evict()
+
+    def append(self, session_id: str, turn: Dict) -> None:
+        """Add a freshly saved turn to a cached session; uncached sessions are left alone."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return
+
+        entry.turns.append(turn)
+        entry.size += _turn_size(turn)
+        self._bytes += _turn_size(turn)
+
+        while len(entry.turns) > self.max_turns:
+            dropped = entry.turns.pop(0)
+            entry.size -= _turn_size(dropped)
+            self._bytes -= _turn_size(dropped)
+            entry.complete = False
+
+        self._entries.move_to_end(session_id)
+        self._evict()
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop a session from the cache."""
+        self._remove(session_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_sessions or self._bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
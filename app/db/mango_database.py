@@ -1,65 +1,454 @@
 import os
 import sys
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
 
 from app.core.config import load_params
 from app.core.logger import setup_logger
-from app.core.exception import AppException
-
-load_dotenv()
+from app.core.exception import AppException, DatabaseError
+from app.core import metrics
+from app.db.history_cache import SessionHistoryCache
+from app.db.pool_metrics import event_listeners
+from app.db.write_behind import WriteBehindQueue
 
 params = load_params("config/params.yaml")
 mongo_params = params.get("mongodb_params", {})
 db_logs_file_path = mongo_params.get("db_logs_file_path", "mongodb.log")
+max_turns_per_session = mongo_params.get("max_turns_per_session", 50)
+
+STORAGE_MODES = ("turns", "bucketed")
 
 logger = setup_logger(name="MongoDBManager", log_file_name=db_logs_file_path)
 
+# Compound index backing the per-session history query (filter + sort)
+HISTORY_INDEX_NAME = "session_id_1_seq_-1__id_-1"
+HISTORY_INDEX_KEYS = [("session_id", ASCENDING), ("seq", DESCENDING), ("_id", DESCENDING)]
+
+# Unique per-session turn sequence numbers; turns written before seq existed are exempt
+SEQ_INDEX_NAME = "session_id_1_seq_1_unique"
+SEQ_INDEX_KEYS = [("session_id", ASCENDING), ("seq", ASCENDING)]
+
+DUPLICATE_KEY_ERROR = 11000
+MAX_SEQ_CONFLICT_RETRIES = 5
+
+
+def _plan_stages(plan: dict) -> list:
+    """Flatten a query plan tree into the list of its stage names."""
+    stages = []
+    if not isinstance(plan, dict):
+        return stages
+    if "stage" in plan:
+        stages.append(plan["stage"])
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def _bucket_update(turns: list, max_turns: int) -> list:
+    """
+    Build the pipeline update that appends turns to a session bucket.
+
+    The bucket's ``seq`` counter is advanced server-side and each appended turn
+    is numbered from it within the same atomic update, so concurrent writers
+    can never hand out the same sequence number. Only the newest
+    ``max_turns`` turns are kept.
+    """
+    base_seq = {"$ifNull": ["$seq", 0]}
+    new_turns = [
+        {
+            "turn_id": turn["turn_id"],
+            "user_input": {"$literal": turn["user_input"]},
+            "chatbot_response": {"$literal": turn["chatbot_response"]},
+            "seq": {"$add": [base_seq, position + 1]},
+        }
+        for position, turn in enumerate(turns)
+    ]
+    return [
+        {
+            "$set": {
+                "turns": {
+                    "$slice": [{"$concatArrays": [{"$ifNull": ["$turns", []]}, new_turns]}, -max_turns]
+                },
+                "seq": {"$add": [base_seq, len(turns)]},
+                "updated_at": "$$NOW",
+            }
+        }
+    ]
+
+
+def _is_seq_conflict(write_error: dict) -> bool:
+    """Return True if a write error is a duplicate (session_id, seq) pair."""
+    return write_error.get("code") == DUPLICATE_KEY_ERROR and (
+        "seq" in (write_error.get("keyPattern") or {})
+        or SEQ_INDEX_NAME in write_error.get("errmsg", "")
+    )
+
 
 class AsyncMongoDatabase:
-    """Async class for handling MongoDB operations."""
+    """
+    Async class for handling MongoDB operations.
+
+    Two storage modes are supported:
+
+    - ``turns``: one document per chat turn in ``MONGO_COLLECTION``.
+    - ``bucketed``: one document per session in ``MONGO_SESSION_COLLECTION``
+      holding a capped array of its most recent turns, so reading the context
+      is a single point read by ``_id``.
+    """
+
+    def __init__(self, config: dict = None):
+        """
+        Args:
+            config (dict): The ``mongodb_params`` config section (defaults to the one in params.yaml).
+        """
+        config = mongo_params if config is None else config
+        history_cache_params = config.get("history_cache", {})
+        write_behind_params = config.get("write_behind", {})
 
-    def __init__(self):
         self.mongo_uri = os.getenv("MONGO_URI")
         self.database_name = os.getenv("MONGO_DB_NAME", "chatbot_db")
         self.collection_name = os.getenv("MONGO_COLLECTION", "chatbot_history")
+        self.session_collection_name = os.getenv("MONGO_SESSION_COLLECTION", "chatbot_sessions")
+        self.summary_collection_name = os.getenv("MONGO_SUMMARY_COLLECTION", "chatbot_summaries")
+        self.storage_mode = config.get("storage_mode", "turns")
+        self.max_turns_per_session = config.get("max_turns_per_session", 50)
 
         if not self.mongo_uri:
             raise AppException("MONGO_URI is not set in environment variables.", sys)
 
+        if self.storage_mode not in STORAGE_MODES:
+            raise AppException(
+                f"Unknown storage_mode '{self.storage_mode}', expected one of {STORAGE_MODES}.", sys
+            )
+
         try:
             logger.info("Initializing async MongoDB client...")
-            self.client = AsyncIOMotorClient(self.mongo_uri)
+            self.client = AsyncIOMotorClient(self.mongo_uri, event_listeners=event_listeners())
             self.db = self.client[self.database_name]
             self.collection = self.db[self.collection_name]
+            self.sessions = self.db[self.session_collection_name]
+            self.summaries = self.db[self.summary_collection_name]
         except Exception as e:
             logger.error("Failed to initialize MongoDB: %s", e)
-            raise AppException(e, sys)
+            raise DatabaseError(e, sys)
+
+        # Recent turns per session, served from memory and updated on write
+        self.history_cache = None
+        if history_cache_params.get("enabled", True):
+            self.history_cache = SessionHistoryCache(
+                max_sessions=history_cache_params.get("max_sessions", 1000),
+                max_turns=history_cache_params.get("max_turns", 20),
+                ttl_seconds=history_cache_params.get("ttl_seconds", 300),
+                max_bytes=history_cache_params.get("max_bytes", 32 * 1024 * 1024),
+            )
+
+        # Batched, acknowledged-on-enqueue persistence of chat turns
+        self.write_behind = None
+        if write_behind_params.get("enabled", True):
+            self.write_behind = WriteBehindQueue(
+                self._upsert_buckets if self.bucketed else self._insert_batch,
+                max_batch_size=write_behind_params.get("max_batch_size", 100),
+                flush_interval_seconds=write_behind_params.get("flush_interval_seconds", 0.5),
+                max_queue_size=write_behind_params.get("max_queue_size", 10000),
+                max_retries=write_behind_params.get("max_retries", 5),
+                retry_backoff_seconds=write_behind_params.get("retry_backoff_seconds", 0.2),
+            )
+
+    @property
+    def bucketed(self) -> bool:
+        return self.storage_mode == "bucketed"
+
+    def _history_cursor(self, session_id: str, limit: int):
+        """Build the cursor used to read a session's most recent turns."""
+        return self.collection.find(
+            {"session_id": session_id},
+            {"_id": 1, "seq": 1, "user_input": 1, "chatbot_response": 1}
+        ).sort([("seq", -1), ("_id", -1)]).limit(limit)
+
+    async def ensure_indexes(self):
+        """Create the indexes the chat history queries rely on (idempotent)."""
+        if self.bucketed:
+            # Session buckets are read by _id, which is always indexed
+            return
+        try:
+            await self.collection.create_index(HISTORY_INDEX_KEYS, name=HISTORY_INDEX_NAME)
+            await self.collection.create_index(
+                SEQ_INDEX_KEYS,
+                name=SEQ_INDEX_NAME,
+                unique=True,
+                partialFilterExpression={"seq": {"$exists": True}},
+            )
+            logger.info("Ensured indexes %s and %s on %s.",
+                        HISTORY_INDEX_NAME, SEQ_INDEX_NAME, self.collection_name)
+        except Exception as e:
+            logger.error("Error creating MongoDB indexes: %s", e)
+            raise DatabaseError(e, sys)
+
+    async def check_history_index(self, session_id: str = "__index_check__") -> bool:
+        """
+        Explain the history query and warn if it is not index-backed.
+
+        Returns:
+            bool: True if the winning plan uses an index scan without an in-memory sort.
+        """
+        if self.bucketed:
+            return True
+        try:
+            explain = await self._history_cursor(session_id, 1).explain()
+        except Exception as e:
+            logger.warning("Could not explain chat history query: %s", e)
+            return False
+
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan)
+        index_backed = "IXSCAN" in stages and "SORT" not in stages and "COLLSCAN" not in stages
+
+        if index_backed:
+            logger.info("Chat history query is index-backed (plan: %s).", " <- ".join(stages))
+        else:
+            logger.warning(
+                "Chat history query is NOT index-backed (plan: %s). "
+                "Expected index %s on %s.",
+                " <- ".join(stages) or "unknown", HISTORY_INDEX_NAME, self.collection_name,
+            )
+        return index_backed
+
+    async def _insert_batch(self, documents: list):
+        """
+        Write a batch of chat documents in a single round trip.
 
-    async def save_chat(self, session_id: str, user_input: str, bot_response: str):
-        """Asynchronously save a chat interaction to MongoDB."""
+        A duplicate ``(session_id, seq)`` means another worker saved a turn
+        for the same session first. That turn and every later turn of the
+        session in the batch are then renumbered after the latest stored turn
+        and written again in their original order, so the session's turns
+        keep the order they were saved in. Any other write errors are
+        re-raised for the caller (or the write-behind queue) to handle.
+        """
         try:
+            with metrics.mongo_operation("insert_turns"):
+                await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            failed = {err["index"]: err for err in write_errors}
+
+            first_conflict = {}
+            for err in write_errors:
+                if _is_seq_conflict(err):
+                    session_id = documents[err["index"]]["session_id"]
+                    first_conflict[session_id] = min(err["index"], first_conflict.get(session_id, err["index"]))
+
+            for session_id, first in first_conflict.items():
+                # Later turns written by insert_many would otherwise precede the renumbered one
+                later = [
+                    (index, documents[index]) for index in range(first, len(documents))
+                    if documents[index]["session_id"] == session_id
+                    and (index not in failed or _is_seq_conflict(failed[index]))
+                ]
+                written = [doc["_id"] for index, doc in later if index not in failed]
+                if written:
+                    with metrics.mongo_operation("delete_turns"):
+                        await self.collection.delete_many({"_id": {"$in": written}})
+                for _, document in later:
+                    await self._insert_with_next_seq(document)
+
+            remaining = [err for err in write_errors if not _is_seq_conflict(err)]
+            if remaining:
+                raise BulkWriteError({**e.details, "writeErrors": remaining})
+        logger.debug("Flushed %d chat document(s) to MongoDB.", len(documents))
+
+    async def _last_seq(self, session_id: str) -> int:
+        """Return the highest stored sequence number of a session (0 if none)."""
+        with metrics.mongo_operation("last_seq"):
+            latest = await self.collection.find_one(
+                {"session_id": session_id, "seq": {"$exists": True}}, {"seq": 1}, sort=[("seq", -1)]
+            )
+        return latest["seq"] if latest else 0
+
+    async def _insert_with_next_seq(self, document: dict):
+        """Renumber a conflicting turn after the session's latest one and insert it."""
+        session_id = document["session_id"]
+        for _ in range(MAX_SEQ_CONFLICT_RETRIES):
+            document["seq"] = await self._last_seq(session_id) + 1
+            try:
+                await self.collection.insert_one(document)
+                break
+            except DuplicateKeyError as e:
+                if not _is_seq_conflict(e.details or {}):
+                    # Same _id: this turn was already written
+                    break
+        else:
+            raise DatabaseError(f"Could not assign a sequence number for session {session_id}.", sys)
+
+        logger.warning("Concurrent write detected for session_id %s; turn saved as seq %d.",
+                       session_id, document["seq"])
+        if self.history_cache is not None:
+            self.history_cache.invalidate(session_id)
+
+    async def _upsert_buckets(self, documents: list):
+        """
+        Append a batch of chat turns to their session buckets in one round trip.
+
+        Turns are grouped per session so each bucket gets a single atomic
+        append (see ``_bucket_update``). On a retried batch the filter skips buckets that already
+        contain the first turn, and the resulting duplicate-key upsert tells
+        the write-behind queue the write had already landed.
+        """
+        retry = any(doc.get("_attempted") for doc in documents)
+        grouped = {}
+        for doc in documents:
+            doc["_attempted"] = True
+            grouped.setdefault(doc["session_id"], []).append(
+                {
+                    "turn_id": doc["turn_id"],
+                    "user_input": doc["user_input"],
+                    "chatbot_response": doc["chatbot_response"],
+                }
+            )
+
+        operations = []
+        for session_id, turns in grouped.items():
+            query = {"_id": session_id}
+            if retry:
+                query["turns.turn_id"] = {"$ne": turns[0]["turn_id"]}
+            operations.append(
+                UpdateOne(query, _bucket_update(turns, self.max_turns_per_session), upsert=True)
+            )
+
+        with metrics.mongo_operation("upsert_buckets"):
+            await self.sessions.bulk_write(operations, ordered=False)
+        logger.debug("Flushed %d chat turn(s) into %d session bucket(s).", len(documents), len(grouped))
+
+    async def save_chat(self, session_id: str, user_input: str, bot_response: str, seq: int = None):
+        """
+        Asynchronously save a chat interaction to MongoDB.
+
+        With write-behind enabled the turn is queued and flushed in a batch
+        later; the call returns as soon as it is queued.
+
+        Args:
+            seq (int): Expected sequence number of this turn (last seen turn + 1).
+                In ``turns`` mode a conflicting number is detected by a unique
+                index and the turn is renumbered; when omitted it is looked up.
+                In ``bucketed`` mode numbers are always assigned server-side.
+        """
+        try:
+            if seq is None and not self.bucketed:
+                seq = await self._last_seq(session_id) + 1
+
             document = {
                 "session_id": session_id,
                 "user_input": user_input,
                 "chatbot_response": bot_response,
             }
-            await self.collection.insert_one(document)
-            logger.debug("Chat saved to MongoDB successfully.")
+            # Ids are assigned up front so the turn can be cached (and retried) before it is written
+            turn_id = ObjectId()
+            if self.bucketed:
+                document["turn_id"] = turn_id
+            else:
+                document["_id"] = turn_id
+                document["seq"] = seq
+
+            if self.write_behind is not None:
+                await self.write_behind.put(document)
+                logger.debug("Chat queued for MongoDB write-behind.")
+            elif self.bucketed:
+                await self._upsert_buckets([document])
+                logger.debug("Chat saved to session bucket successfully.")
+            else:
+                await self._insert_batch([document])
+                logger.debug("Chat saved to MongoDB successfully.")
+
+            if self.history_cache is not None:
+                self.history_cache.append(
+                    session_id,
+                    {
+                        "turn_id": turn_id,
+                        "seq": seq,
+                        "user_input": user_input,
+                        "chatbot_response": bot_response,
+                    },
+                )
         except Exception as e:
             logger.error("Error inserting chat document: %s", e)
-            raise AppException(e, sys)
+            raise DatabaseError(e, sys)
+
+    async def fetch_recent_turns(self, session_id: str, limit: int = 5) -> list:
+        """
+        Fetch a session's most recent turns, oldest first.
+
+        Each turn is a dict with ``turn_id``, ``seq`` (None for turns saved before
+        sequence numbers existed), ``user_input`` and ``chatbot_response``.
+
+        Served from the in-process history cache when possible; otherwise read
+        from MongoDB, merged with turns still waiting in the write-behind queue
+        and cached for the following requests.
+        """
+        if self.history_cache is not None:
+            cached = self.history_cache.get(session_id, limit)
+            if cached is not None:
+                return cached
+
+        # Taken before the read: a turn flushed in between is then seen twice and deduplicated
+        pending = self.write_behind.pending(session_id) if self.write_behind is not None else []
+
+        if self.bucketed:
+            with metrics.mongo_operation("fetch_bucket"):
+                bucket = await self.sessions.find_one(
+                    {"_id": session_id}, {"_id": 0, "turns": {"$slice": -limit}}
+                )
+            turns = [
+                {
+                    "turn_id": turn.get("turn_id"),
+                    "seq": turn.get("seq"),
+                    "user_input": turn["user_input"],
+                    "chatbot_response": turn["chatbot_response"],
+                }
+                for turn in (bucket or {}).get("turns", [])
+            ]
+        else:
+            cursor = self._history_cursor(session_id, limit)
+            with metrics.mongo_operation("fetch_turns"):
+                turns = [
+                    {
+                        "turn_id": turn["_id"],
+                        "seq": turn.get("seq"),
+                        "user_input": turn["user_input"],
+                        "chatbot_response": turn["chatbot_response"],
+                    }
+                    async for turn in cursor
+                ]
+            turns.reverse()
+
+        complete = len(turns) < limit
+        if pending:
+            stored = {turn["turn_id"] for turn in turns}
+            turns += [
+                {
+                    "turn_id": doc.get("turn_id", doc.get("_id")),
+                    "seq": doc.get("seq"),
+                    "user_input": doc["user_input"],
+                    "chatbot_response": doc["chatbot_response"],
+                }
+                for doc in pending
+                if doc.get("turn_id", doc.get("_id")) not in stored
+            ]
+            complete = complete and len(turns) < limit
+            turns = turns[-limit:]
+
+        if self.history_cache is not None:
+            self.history_cache.put(session_id, turns, complete=complete)
+        return turns
 
     async def fetch_recent_chats(self, session_id: str, limit: int = 5) -> str:
         """Fetch recent chats asynchronously."""
         try:
-            cursor = self.collection.find(
-                {"session_id": session_id},
-                {"_id": 0, "user_input": 1, "chatbot_response": 1}
-            ).sort("_id", -1).limit(limit)
-
-            chats = [chat async for chat in cursor]
-            chats.reverse()
+            chats = await self.fetch_recent_turns(session_id, limit)
 
             if not chats:
                 logger.info("No previous chats found for session_id: %s", session_id)
@@ -74,8 +463,59 @@ class AsyncMongoDatabase:
             logger.error("Error fetching chat history: %s", e)
             return ""
 
+    async def fetch_summary(self, session_id: str) -> dict:
+        """
+        Fetch the rolling summary of a session's older turns.
+
+        Returns:
+            dict: ``summary`` text, ``summarized_until``, the id of the newest
+            turn folded into it (None when the session has no summary yet), and
+            ``summarized_until_seq``, that turn's sequence number (None if it has none).
+        """
+        try:
+            with metrics.mongo_operation("fetch_summary"):
+                doc = await self.summaries.find_one(
+                    {"_id": session_id}, {"_id": 0, "summary": 1, "summarized_until": 1, "summarized_until_seq": 1}
+                )
+        except Exception as e:
+            logger.error("Error fetching conversation summary: %s", e)
+            doc = None
+        doc = doc or {}
+        return {
+            "summary": doc.get("summary", ""),
+            "summarized_until": doc.get("summarized_until"),
+            "summarized_until_seq": doc.get("summarized_until_seq"),
+        }
+
+    async def save_summary(self, session_id: str, summary: str, summarized_until, summarized_until_seq: int = None):
+        """Store a session's rolling summary along with the newest turn it covers."""
+        try:
+            with metrics.mongo_operation("save_summary"):
+                await self.summaries.update_one(
+                    {"_id": session_id},
+                    {
+                        "$set": {
+                            "summary": summary,
+                            "summarized_until": summarized_until,
+                            "summarized_until_seq": summarized_until_seq,
+                            "updated_at": datetime.now(timezone.utc),
+                        }
+                    },
+                    upsert=True,
+                )
+            logger.debug("Conversation summary saved for session_id: %s", session_id)
+        except Exception as e:
+            logger.error("Error saving conversation summary: %s", e)
+            raise DatabaseError(e, sys)
+
     async def close_connection(self):
-        """Close MongoDB connection."""
+        """Flush pending writes and close MongoDB connection."""
+        if self.write_behind is not None:
+            try:
+                await self.write_behind.close()
+            except Exception as e:
+                logger.error("Error flushing pending chat writes: %s", e)
+
         try:
             self.client.close()
             logger.info("MongoDB connection closed.")
@@ -0,0 +1,137 @@
+"""
+Migrate per-turn chat history into per-session bucket documents.
+
+Usage:
+    python -m app.db.migrate_to_buckets [--max-turns N] [--session-id ID] [--dry-run]
+
+Each session's newest ``max_turns`` turns are copied from ``MONGO_COLLECTION``
+into ``MONGO_SESSION_COLLECTION`` with a server-side ``$merge``. Turns keep
+their original ``_id`` as ``turn_id``, so the migration can be re-run safely and
+merges with buckets already written in ``bucketed`` mode. The source
+collection is left untouched. Requires MongoDB 5.2+ (``$lastN``).
+"""
+import sys
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+from app.core.exception import AppException
+from app.db.mango_database import AsyncMongoDatabase, logger, max_turns_per_session
+
+
+def build_pipeline(sessions_collection: str, max_turns: int, session_id: str = None) -> list:
+    """Build the aggregation that groups turns per session and merges them into buckets."""
+    pipeline = []
+    if session_id:
+        pipeline.append({"$match": {"session_id": session_id}})
+
+    # Walks the {session_id: 1, seq: -1, _id: -1} history index backwards
+    pipeline.append({"$sort": {"session_id": -1, "seq": 1, "_id": 1}})
+    pipeline.append({
+        "$group": {
+            "_id": "$session_id",
+            "turns": {
+                "$lastN": {
+                    "n": max_turns,
+                    "input": {
+                        "turn_id": "$_id",
+                        "seq": "$seq",
+                        "user_input": "$user_input",
+                        "chatbot_response": "$chatbot_response",
+                    },
+                }
+            },
+            "seq": {"$max": "$seq"},
+        }
+    })
+    pipeline.append({"$set": {"updated_at": "$$NOW"}})
+    pipeline.append({
+        "$merge": {
+            "into": sessions_collection,
+            "on": "_id",
+            "whenMatched": [
+                {
+                    "$set": {
+                        "turns": {
+                            "$slice": [
+                                {
+                                    "$concatArrays": [
+                                        {
+                                            "$filter": {
+                                                "input": "$$new.turns",
+                                                "cond": {
+                                                    "$not": [{"$in": ["$$this.turn_id", "$turns.turn_id"]}]
+                                                },
+                                            }
+                                        },
+                                        "$turns",
+                                    ]
+                                },
+                                -max_turns,
+                            ]
+                        },
+                        "seq": {"$max": ["$seq", "$$new.seq"]},
+                        "updated_at": "$$new.updated_at",
+                    }
+                }
+            ],
+            "whenNotMatched": "insert",
+        }
+    })
+    return pipeline
+
+
+async def migrate(max_turns: int, session_id: str = None, dry_run: bool = False) -> int:
+    """
+    Run the migration.
+
+    Returns:
+        int: Number of sessions in the source collection that were (or would be) migrated.
+    """
+    mongo = AsyncMongoDatabase()
+    try:
+        query = {"session_id": session_id} if session_id else {}
+        # Counted server-side: distinct() returns every id in one document, capped at 16 MB
+        counted = await mongo.collection.aggregate(
+            [{"$match": query}, {"$group": {"_id": "$session_id"}}, {"$count": "sessions"}],
+            allowDiskUse=True,
+        ).to_list(length=1)
+        sessions = counted[0]["sessions"] if counted else 0
+        logger.info("Found %d session(s) in %s.", sessions, mongo.collection_name)
+
+        if dry_run or sessions == 0:
+            return sessions
+
+        pipeline = build_pipeline(mongo.session_collection_name, max_turns, session_id)
+        cursor = mongo.collection.aggregate(pipeline, allowDiskUse=True)
+        async for _ in cursor:
+            pass
+
+        migrated = await mongo.sessions.count_documents({})
+        logger.info("Migration complete: %s now holds %d session bucket(s).",
+                    mongo.session_collection_name, migrated)
+        return sessions
+
+    except Exception as e:
+        logger.error("Migration to session buckets failed: %s", e)
+        raise AppException(e, sys)
+    finally:
+        await mongo.close_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-turn chat history into session buckets.")
+    parser.add_argument("--max-turns", type=int, default=max_turns_per_session,
+                        help="Number of recent turns kept per session bucket.")
+    parser.add_argument("--session-id", default=None, help="Migrate a single session only.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the sessions to migrate.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    sessions = asyncio.run(migrate(args.max_turns, args.session_id, args.dry_run))
+    action = "Would migrate" if args.dry_run else "Migrated"
+    print(f"{action} {sessions} session(s).")
+
+
+if __name__ == "__main__":
+    main()
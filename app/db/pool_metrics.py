@@ -0,0 +1,52 @@
+from pymongo import monitoring
+
+from app.core import metrics
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Feeds pymongo connection pool events into the pool gauges."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        metrics.mongo_pool_connections.labels(_address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        metrics.mongo_pool_connections.labels(_address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        metrics.mongo_pool_checked_out.labels(_address(event)).inc()
+        if getattr(event, "duration", None) is not None:
+            metrics.mongo_pool_wait_seconds.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        metrics.mongo_pool_checked_out.labels(_address(event)).dec()
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+def event_listeners() -> list:
+    """Listeners to pass to a MongoDB client."""
+    return [PoolMetricsListener()] if metrics.enabled else []
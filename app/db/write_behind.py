@@ -0,0 +1,184 @@
+import random
+import asyncio
+import contextvars
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure, PyMongoError
+
+from app.core.logger import setup_logger
+
+logger = setup_logger(name="WriteBehindQueue", log_file_name="write_behind.log")
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Return True for MongoDB errors that are worth retrying."""
+    if isinstance(error, (AutoReconnect, ConnectionFailure)):
+        return True
+    if isinstance(error, PyMongoError):
+        return error.has_error_label("RetryableWriteError")
+    return False
+
+
+def only_duplicate_keys(error: BulkWriteError) -> bool:
+    """
+    Return True if a bulk write failed only on duplicate keys.
+
+    Documents get their ``_id`` assigned before the first attempt, so on retry
+    the ones that already made it in are reported as duplicates and can be
+    treated as written.
+    """
+    write_errors = error.details.get("writeErrors", [])
+    return bool(write_errors) and all(
+        err.get("code") == DUPLICATE_KEY_ERROR for err in write_errors
+    )
+
+
+class WriteBehindQueue:
+    """
+    Asynchronous write-behind buffer for chat turns.
+
+    ``put`` acknowledges as soon as the document is queued; a background task
+    flushes queued documents in batches when ``max_batch_size`` is reached or
+    ``flush_interval_seconds`` elapses. A full queue makes ``put`` wait
+    (backpressure), transient errors are retried with jittered backoff, and
+    ``close`` drains everything still buffered. Documents that are queued
+    or being flushed can be read back per session with ``pending``.
+    """
+
+    def __init__(
+        self,
+        flush_batch: Callable[[List[dict]], Awaitable[None]],
+        max_batch_size: int = 100,
+        flush_interval_seconds: float = 0.5,
+        max_queue_size: int = 10000,
+        max_retries: int = 5,
+        retry_backoff_seconds: float = 0.2,
+    ):
+        """
+        Args:
+            flush_batch (Callable): Coroutine function that persists a list of documents.
+            max_batch_size (int): Flush as soon as this many documents are buffered.
+            flush_interval_seconds (float): Maximum time a document waits before being flushed.
+            max_queue_size (int): Queue capacity; ``put`` blocks once it is reached.
+            max_retries (int): Retries for a batch failing with transient errors.
+            retry_backoff_seconds (float): Base delay for exponential backoff between retries.
+        """
+        self.flush_batch = flush_batch
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+        # Queued or in-flight documents per session, in queue order
+        self._pending: Dict[str, List[dict]] = {}
+
+        self.flushed = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start the background flush task on the running event loop."""
+        if self._worker is None or self._worker.done():
+            # Run in an empty context: when started lazily from a request, the worker must
+            # not inherit (and log every later record with) that request's id
+            self._worker = contextvars.Context().run(asyncio.create_task, self._run())
+
+    async def put(self, document: dict) -> None:
+        """Queue a document for writing, waiting if the queue is full."""
+        if self._closing:
+            raise RuntimeError("Write-behind queue is closed.")
+        self.start()
+        self._pending.setdefault(document["session_id"], []).append(document)
+        try:
+            await self._queue.put(document)
+        except BaseException:
+            self._forget([document])
+            raise
+
+    def pending(self, session_id: str) -> List[dict]:
+        """Return the documents of a session that are not written yet, oldest first."""
+        return list(self._pending.get(session_id, ()))
+
+    def _forget(self, batch: List[dict]) -> None:
+        for document in batch:
+            documents = self._pending.get(document["session_id"], [])
+            documents[:] = [doc for doc in documents if doc is not document]
+            if not documents:
+                self._pending.pop(document["session_id"], None)
+
+    async def _next_batch(self) -> List[dict]:
+        """Wait for one document, then gather more until the batch is full or the interval passes."""
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval_seconds
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush_with_retry(self, batch: List[dict]) -> None:
+        attempt = 0
+        while True:
+            try:
+                await self.flush_batch(batch)
+                self.flushed += len(batch)
+                return
+            except BulkWriteError as e:
+                if attempt > 0 and only_duplicate_keys(e):
+                    self.flushed += len(batch)
+                    return
+                error = e
+            except Exception as e:
+                error = e
+
+            if not is_transient_error(error) or attempt >= self.max_retries:
+                self.dropped += len(batch)
+                logger.error("Dropping %d chat document(s) after %d attempt(s): %s",
+                             len(batch), attempt + 1, error)
+                return
+
+            delay = self.retry_backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+            attempt += 1
+            logger.warning("Transient error flushing %d document(s), retry %d in %.2fs: %s",
+                           len(batch), attempt, delay, error)
+            await asyncio.sleep(delay)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._flush_with_retry(batch)
+            finally:
+                self._forget(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def flush(self) -> None:
+        """Wait until every queued document has been flushed."""
+        if self._worker is not None and not self._worker.done():
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Stop accepting documents, flush what is buffered and stop the worker."""
+        self._closing = True
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        logger.info("Write-behind queue closed (%d flushed, %d dropped).", self.flushed, self.dropped)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
@@ -0,0 +1,130 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when an LLM call is not admitted; carries the HTTP status to return."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket limiting the rate at which calls may start."""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class AdmissionController:
+    """
+    Bounds concurrent outbound LLM calls for this worker.
+
+    At most ``max_concurrent`` calls run at once, optionally also limited to
+    ``rate_per_second`` starts. Up to ``max_queue`` further calls wait for a
+    slot; beyond that, calls are rejected immediately with 429. A queued call
+    that cannot start within its deadline is rejected with 503, so under a
+    burst latency degrades gracefully instead of every request timing out.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_queue: int = 64,
+        queue_timeout_seconds: float = 10,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[int] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._bucket = TokenBucket(rate_per_second, burst or max_concurrent) if rate_per_second else None
+
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    async def _acquire(self) -> None:
+        await self._semaphore.acquire()
+        if self._bucket is None:
+            return
+        try:
+            while (delay := self._bucket.wait_time()) > 0:
+                await asyncio.sleep(delay)
+            self._bucket.take()
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        """
+        Hold a slot for one LLM call.
+
+        Args:
+            timeout (float): Maximum seconds to wait in the queue; defaults to
+                ``queue_timeout_seconds``.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out.
+        """
+        if self._semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected("Server is busy, too many requests queued.", status_code=429)
+
+        wait = self.queue_timeout_seconds if timeout is None else timeout
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self._acquire(), wait)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            raise AdmissionRejected(
+                "Server is busy, request timed out waiting for capacity.",
+                status_code=503,
+                retry_after=max(1, int(wait)),
+            )
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
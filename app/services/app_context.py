@@ -0,0 +1,248 @@
+import os
+import sys
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+
+from app.core import metrics
+from app.core.config import load_params
+from app.core.deadline import Deadline
+from app.core.exception import ClientError
+from app.core.logger import setup_logger
+from app.services.chatbot import build_prompt
+from app.services.llm_registry import LLMRegistry
+from app.services.llm_providers import build_provider
+from app.services.context_builder import ContextBuilder
+from app.services.summarizer import ConversationSummarizer
+from app.services.response_cache import build_response_cache
+from app.services.single_flight import SingleFlight
+from app.services.session_locks import SessionLocks
+from app.services.admission import AdmissionController
+from app.services.resilience import ResilientCaller
+from app.services.model_router import ModelRouter
+
+
+class AppContext:
+    """
+    Everything a worker shares across requests: config, loggers, the MongoDB
+    client, LLM clients, caches and the admission/resilience state.
+
+    Built once per process (in the FastAPI lifespan) and handed to each
+    ``Chatbot``, so every request uses the same client and connection pools.
+    Motor, LangChain and numpy are imported here rather than when the app
+    module is, keeping process start-up short.
+    """
+
+    def __init__(self, params: dict):
+        """
+        Args:
+            params (dict): The parsed params.yaml.
+        """
+        from langchain_core.output_parsers import StrOutputParser
+        from app.db.mango_database import AsyncMongoDatabase
+        from app.services.semantic_cache import build_semantic_cache
+
+        self.params = params
+        chatbot_params = params.get("chatbot", {})
+        mongo_params = params.get("mongodb_params", {})
+        registry_params = chatbot_params.get("llm_registry", {})
+        context_params = chatbot_params.get("context", {})
+        summarizer_params = chatbot_params.get("summarizer", {})
+        semantic_cache_params = chatbot_params.get("semantic_cache", {})
+        admission_params = chatbot_params.get("admission", {})
+        resilience_params = chatbot_params.get("resilience", {})
+        hedge_params = resilience_params.get("hedge", {})
+        breaker_params = resilience_params.get("circuit_breaker", {})
+        router_params = chatbot_params.get("model_router", {})
+
+        self.mongo_params = mongo_params
+        self.registry_params = registry_params
+        self.deadline_params = chatbot_params.get("deadline", {})
+        self.disconnect_poll_seconds = params.get("fastapi", {}).get("disconnect_poll_seconds", 0.5)
+
+        self.logger: logging.Logger = setup_logger(
+            name="Chatbot", log_file_name=chatbot_params.get("chatbot_logs_file_path", "chatbot.log")
+        )
+        self.api_logger: logging.Logger = setup_logger(
+            "FastAPI", params.get("main", {}).get("fastapi_log_file_path", "fastapi.log")
+        )
+
+        # Models clients may ask for; anything else is rejected before a client is built for it
+        self.allowed_models = (
+            set(context_params.get("model_token_budgets", {}))
+            | set(router_params.get("fallbacks", {}))
+            | {model for models in router_params.get("fallbacks", {}).values() for model in models}
+            | set(registry_params.get("preload_models", []))
+            | {summarizer_params.get("model", "gemini-2.5-flash")}
+        )
+
+        self.prompt = build_prompt()
+
+        # One MongoDB client (and connection pool) for the whole worker
+        self.mongo = AsyncMongoDatabase(mongo_params)
+
+        # Shared LLM clients, reused across requests
+        self.llm_registry = LLMRegistry(
+            # Retries are handled by ``resilience`` below rather than inside the client
+            provider=build_provider(
+                chatbot_params.get("provider", {}),
+                client_max_retries=resilience_params.get("client_max_retries", 1),
+            ),
+            prompt=self.prompt,
+            output_parser=StrOutputParser(),
+            idle_ttl_seconds=registry_params.get("idle_ttl_seconds", 900),
+            sweep_interval_seconds=registry_params.get("sweep_interval_seconds", 60),
+        )
+
+        # Packs as many recent turns as fit in each model's token budget
+        self.context_builder = ContextBuilder(
+            default_budget=context_params.get("default_token_budget", 2000),
+            model_budgets=context_params.get("model_token_budgets", {}),
+            max_turns=context_params.get("max_turns", chatbot_params.get("chat_history_limit", 5)),
+            chars_per_token=context_params.get("chars_per_token", 4.0),
+        )
+
+        # Chatbot reads one turn beyond the context window, so the history cache must
+        # hold at least that many turns or every long session misses it
+        history_cache = self.mongo.history_cache
+        if history_cache is not None and history_cache.max_turns < self.context_builder.max_turns + 1:
+            if "max_turns" in mongo_params.get("history_cache", {}):
+                self.logger.warning(
+                    "history_cache.max_turns (%d) is below context.max_turns + 1; raising it to %d.",
+                    history_cache.max_turns, self.context_builder.max_turns + 1,
+                )
+            history_cache.max_turns = self.context_builder.max_turns + 1
+
+        # Rolling summaries of turns that have left the context window
+        self.summarizer = None
+        if summarizer_params.get("enabled", True):
+            self.summarizer = ConversationSummarizer(
+                self.mongo,
+                self.llm_registry,
+                model=summarizer_params.get("model", "gemini-2.5-flash"),
+                max_words=summarizer_params.get("max_words", 200),
+                max_pending_sessions=summarizer_params.get("max_pending_sessions", 1000),
+                cache_size=summarizer_params.get("cache_size", 1000),
+                cache_ttl_seconds=summarizer_params.get("cache_ttl_seconds", 300),
+                timeout_seconds=summarizer_params.get("timeout_seconds", 60),
+            )
+
+        # Exact-match cache of answers for identical (model, rendered prompt) inputs
+        self.response_cache = build_response_cache(chatbot_params.get("response_cache", {}))
+
+        # Answers for paraphrased questions, matched by local embeddings
+        self.semantic_cache = build_semantic_cache(semantic_cache_params)
+        self.semantic_cache_requires_empty_context = semantic_cache_params.get("only_without_context", True)
+
+        # Shares one LLM call and one saved turn between concurrent identical requests
+        self.single_flight = SingleFlight() if chatbot_params.get("single_flight", True) else None
+
+        # Serializes turns of the same session within this worker
+        self.session_locks = SessionLocks()
+
+        # Bounds concurrent Gemini calls; excess requests queue briefly or are rejected
+        self.admission = AdmissionController(
+            max_concurrent=admission_params.get("max_concurrent", 16),
+            max_queue=admission_params.get("max_queue", 64),
+            queue_timeout_seconds=admission_params.get("queue_timeout_seconds", 10),
+            rate_per_second=admission_params.get("rate_per_second"),
+            burst=admission_params.get("burst"),
+        )
+        metrics.llm_in_flight.set_function(lambda: self.admission.in_flight)
+        metrics.llm_queued.set_function(lambda: self.admission.queued)
+        if self.mongo.write_behind is not None:
+            metrics.mongo_write_behind_queue.set_function(self.mongo.write_behind.qsize)
+
+        # Retries, hedged requests and per-model circuit breakers around Gemini calls
+        self.resilience = ResilientCaller(
+            max_attempts=resilience_params.get("max_attempts", 3),
+            base_delay_seconds=resilience_params.get("base_delay_seconds", 0.5),
+            max_delay_seconds=resilience_params.get("max_delay_seconds", 4.0),
+            hedge_enabled=hedge_params.get("enabled", False),
+            hedge_delay_seconds=hedge_params.get("delay_seconds", 2.0),
+            hedge_min_samples=hedge_params.get("min_samples", 20),
+            latency_window=hedge_params.get("latency_window", 200),
+            failure_threshold=breaker_params.get("failure_threshold", 5),
+            reset_timeout_seconds=breaker_params.get("reset_timeout_seconds", 30),
+        )
+
+        # Falls back to another model while the requested one is slow or failing
+        self.model_router = None
+        if router_params.get("enabled", True):
+            self.model_router = ModelRouter(
+                fallbacks=router_params.get("fallbacks", {}),
+                window_seconds=router_params.get("window_seconds", 60),
+                min_samples=router_params.get("min_samples", 10),
+                max_error_rate=router_params.get("max_error_rate", 0.5),
+                max_p95_seconds=router_params.get("max_p95_seconds", 20),
+                is_open=lambda model: self.resilience.breaker(model).is_open(),
+            )
+
+    @classmethod
+    def from_config(cls, params_path: str = "config/params.yaml") -> "AppContext":
+        """Load ``.env`` and params.yaml and build the context from them."""
+        load_dotenv()
+
+        # LangSmith tracing, only when a key is configured and tracing was not set explicitly
+        if os.getenv("LANGCHAIN_API_KEY"):
+            os.environ.setdefault("LANGCHAIN_TRACING_V2", "true")
+
+        return cls(load_params(params_path))
+
+    def check_model(self, model: str) -> None:
+        """
+        Raise ``ClientError`` unless ``model`` is a configured model.
+
+        Each model gets its own pooled client, breaker and router entry, so
+        arbitrary names from clients must not reach the registry.
+        """
+        if model not in self.allowed_models:
+            raise ClientError(
+                f"Unknown model '{model}', expected one of {sorted(self.allowed_models)}.", sys
+            )
+
+    def new_deadline(self, timeout_seconds: float = None) -> Deadline:
+        """
+        Create the time budget for one request.
+
+        Uses the client-supplied timeout when given (capped at ``max_seconds``),
+        otherwise ``default_seconds``, split across the history, llm and save stages.
+        """
+        default_seconds = self.deadline_params.get("default_seconds", 55)
+        max_seconds = self.deadline_params.get("max_seconds", 120)
+        total = min(timeout_seconds or default_seconds, max_seconds)
+        return Deadline(
+            total, self.deadline_params.get("stage_fractions", {"history": 0.1, "llm": 0.8, "save": 0.1})
+        )
+
+    async def start(self) -> None:
+        """Prepare the database and LLM clients before the first request."""
+        if self.mongo_params.get("ensure_indexes", True):
+            await self.mongo.ensure_indexes()
+        if self.mongo_params.get("explain_check", True):
+            await self.mongo.check_history_index()
+
+        # Build LLM clients up front so the first requests skip client setup; the provider
+        # SDK import is slow, so this runs on a worker thread instead of the event loop
+        await asyncio.to_thread(self.llm_registry.warmup, self.registry_params.get("preload_models", []))
+        self.llm_registry.start()
+
+        # Background workers are started here, outside any request
+        if self.mongo.write_behind is not None:
+            self.mongo.write_behind.start()
+        if self.summarizer is not None:
+            self.summarizer.start()
+        self.api_logger.info("LLM registry ready with %d preloaded model(s).", len(self.llm_registry))
+        metrics.loop_lag_monitor.start()
+
+    async def close(self) -> None:
+        """Stop background work and release every client."""
+        await metrics.loop_lag_monitor.close()
+        if self.summarizer is not None:
+            await self.summarizer.close()
+        await self.llm_registry.close()
+        if self.response_cache is not None:
+            await self.response_cache.close()
+        # Flushes any chat turns still buffered by the write-behind queue
+        await self.mongo.close_connection()
@@ -1,73 +1,322 @@
-import os
 import sys
-from dotenv import load_dotenv
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
+import time
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator
+from contextlib import asynccontextmanager
 
-from app.core.logger import setup_logger
-from app.core.config import load_params
-from app.core.exception import AppException
-from app.db.mango_database import AsyncMongoDatabase
+from app.core.exception import AppException, ClientError, ProviderError
+from app.core.deadline import Deadline, DeadlineExceeded
+from app.core.timing import StageTimings
+from app.services.context_builder import format_turn
+from app.services.summarizer import after_summary
+from app.services.response_cache import make_cache_key
+from app.services.admission import AdmissionRejected
 
-load_dotenv()
-gemini_api_key = os.getenv("GOOGLE_API_KEY")
-if not gemini_api_key:
-    raise EnvironmentError("GOOGLE_API_KEY is missing in the .env file")
+if TYPE_CHECKING:
+    from app.services.app_context import AppContext
 
-params = load_params("config/params.yaml")
-chatbot_params = params.get("chatbot", {})
+SYSTEM_PROMPT = (
+    "You are a helpful assistant who answers user queries accurately and politely. "
+    "You are aware of the previous conversation history provided below."
+)
+USER_PROMPT = "Context:\n{context}\n\nQuestion: {input}"
 
-chatbot_logs_file_path = chatbot_params.get("chatbot_logs_file_path", "chatbot.log")
-chat_history_limit = chatbot_params.get("chat_history_limit", 5)
+FALLBACK_RESPONSE = "I'm sorry, I couldn't generate a valid response."
 
-logger = setup_logger(name="Chatbot", log_file_name=chatbot_logs_file_path)
 
-# Initialize async DB
-mongo = AsyncMongoDatabase()
+def build_prompt():
+    """Build the chat prompt template; LangChain is imported here rather than at startup."""
+    from langchain_core.prompts import ChatPromptTemplate
 
-prompt = ChatPromptTemplate.from_messages([
-    ("system", "You are a helpful assistant who answers user queries accurately and politely. "
-               "You are aware of the previous conversation history provided below."),
-    ("user", "Context:\n{context}\n\nQuestion: {input}")
-])
-output_parser = StrOutputParser()
+    return ChatPromptTemplate.from_messages([("system", SYSTEM_PROMPT), ("user", USER_PROMPT)])
 
 
 class Chatbot:
-    """Async Chatbot for handling user queries."""
+    """
+    Async Chatbot for handling user queries.
 
-    def __init__(self, llm: str, question: str, session_id: str):
+    ``llm`` is the model the client asked for; ``model`` is the one that
+    actually answers, which differs when the router falls back. Clients,
+    caches and limits are shared through ``app_context``.
+    """
+
+    def __init__(
+        self, app_context: "AppContext", llm: str, question: str, session_id: str, deadline: Deadline = None
+    ):
+        self.app_context = app_context
+        self.logger = app_context.logger
         self.llm = llm
+        self.model = llm
         self.question = question
         self.session_id = session_id
+        self.deadline = deadline or app_context.new_deadline()
+        self.timings = StageTimings()
+        self.response = None
+        self.aged_out_turns = []
+        self.next_seq = None
+        self._cache_key = None
+        self._question_vector = None
+
+    async def _load_context(self) -> str:
+        """
+        Build the prompt context: the session summary (if any) plus the
+        recent turns that fit in the model's token budget.
+        """
+        # One extra turn so the turn leaving the window is seen before it disappears
+        limit = self.app_context.context_builder.max_turns + (1 if self.app_context.summarizer else 0)
+        history = self.app_context.mongo.fetch_recent_turns(self.session_id, limit)
+
+        with self.timings.stage("history"):
+            if self.app_context.summarizer is not None:
+                turns, summary = await asyncio.gather(
+                    history, self.app_context.summarizer.get_summary(self.session_id), return_exceptions=True
+                )
+            else:
+                (turns,), summary = await asyncio.gather(history, return_exceptions=True), None
+
+        if isinstance(turns, Exception):
+            self.logger.error(f"[Session {self.session_id}] Error fetching chat history: {turns}")
+            turns = []
+        if isinstance(summary, Exception):
+            self.logger.error(f"[Session {self.session_id}] Error fetching conversation summary: {summary}")
+            summary = None
+
+        # Sequence number this turn expects to take; conflicts are resolved when saving
+        self.next_seq = ((turns[-1].get("seq") or 0) + 1) if turns else 1
+
+        with self.timings.stage("prompt"):
+            selected = self.app_context.context_builder.select_turns(turns, self.model)
+            context = "\n".join(format_turn(turn) for turn in selected)
+
+        if summary is None:
+            return context
+
+        # Turns no longer in the prompt and not yet covered by the summary
+        self.aged_out_turns = [
+            turn for turn in turns[:len(turns) - len(selected)] if after_summary(turn, summary)
+        ]
+
+        if summary["summary"]:
+            context = (
+                f"Summary of earlier conversation:\n{summary['summary']}\n\n"
+                f"Recent conversation:\n{context}"
+            )
+        return context
+
+    async def _cached_response(self, context: str):
+        """Look the answer up in the exact-match cache, then the semantic cache."""
+        with self.timings.stage("cache"):
+            return await self._lookup_caches(context)
+
+    async def _lookup_caches(self, context: str):
+        if self.app_context.response_cache is not None:
+            self._cache_key = make_cache_key(
+                self.llm, self.app_context.prompt.format(input=self.question, context=context)
+            )
+            response = await self.app_context.response_cache.get(self._cache_key)
+            if response is not None:
+                self.logger.info(f"[Session {self.session_id}] Served response from cache.")
+                return response
+
+        semantic_cache = self.app_context.semantic_cache
+        if semantic_cache is not None and not (context and self.app_context.semantic_cache_requires_empty_context):
+            response, self._question_vector = await semantic_cache.lookup(self.llm, self.question)
+            if response is not None:
+                self.logger.info(f"[Session {self.session_id}] Served response from semantic cache.")
+                return response
+
+        return None
+
+    async def _remember_response(self, response: str) -> None:
+        """Store a freshly generated answer in the response caches."""
+        if self.model != self.llm:
+            # Answers from a fallback model are not cached under the requested one
+            return
+        if self.app_context.response_cache is not None and self._cache_key is not None:
+            await self.app_context.response_cache.set(self._cache_key, response)
+        if self.app_context.semantic_cache is not None:
+            self.app_context.semantic_cache.store(self.llm, self._question_vector, response)
+
+    def _queue_timeout(self) -> float:
+        """Admission queue wait allowed for this request."""
+        return min(self.app_context.admission.queue_timeout_seconds, self.deadline.remaining())
+
+    async def _context_within_deadline(self) -> str:
+        """Load the context within the history budget, answering without it if that runs out."""
+        try:
+            return await self.deadline.run("history", self._load_context())
+        except DeadlineExceeded:
+            self.logger.warning(f"[Session {self.session_id}] History fetch exceeded its budget; continuing without context.")
+            self.next_seq = None
+            return ""
+
+    async def _save_within_deadline(self, response: str) -> None:
+        """Save the turn unless the request has already run out of time."""
+        self.deadline.check("save")
+        with self.timings.stage("save"):
+            await self.deadline.run(
+                "save", self.app_context.mongo.save_chat(self.session_id, self.question, response, seq=self.next_seq)
+            )
+
+    def _route(self) -> None:
+        """Pick the model to answer with, based on live model health."""
+        if self.app_context.model_router is not None:
+            self.model = self.app_context.model_router.route(self.llm)
+
+    @asynccontextmanager
+    async def _llm_slot(self):
+        """
+        Wait for admission, then time the LLM call and feed its outcome to the router.
+
+        Errors raised by the call are re-raised as ``ProviderError``.
+        """
+        queued = time.perf_counter()
+        async with self.app_context.admission.slot(timeout=self._queue_timeout()):
+            self.timings.add("queue", time.perf_counter() - queued)
+            try:
+                with self.timings.stage("llm"):
+                    if self.app_context.model_router is None:
+                        yield
+                    else:
+                        with self.app_context.model_router.track(self.model):
+                            yield
+            except (AppException, AdmissionRejected, DeadlineExceeded):
+                raise
+            except Exception as e:
+                raise ProviderError(e, sys) from e
+
+    def _schedule_summary(self) -> None:
+        """Hand aged-out turns to the background summarizer."""
+        if self.app_context.summarizer is not None and self.aged_out_turns:
+            self.app_context.summarizer.schedule(self.session_id, self.aged_out_turns)
 
     async def generate_response(self) -> str:
-        """Generate LLM response asynchronously."""
+        """
+        Generate LLM response asynchronously.
+
+        Concurrent calls with the same session, model and question (client
+        retries, duplicate tabs) are coalesced into a single generation.
+        """
         try:
             if not self.question.strip():
-                raise ValueError("Question cannot be empty.")
+                raise ClientError("Question cannot be empty.", sys)
+            self.app_context.check_model(self.llm)
+
+            single_flight = self.app_context.single_flight
+            if single_flight is None:
+                leader = await self._generate()
+            else:
+                leader = await single_flight.do((self.session_id, self.llm, self.question), self._generate)
+            # Coalesced callers report the model and timings of the generation they shared
+            self.model, self.timings = leader.model, leader.timings
+            return leader.response
+
+        except (AppException, AdmissionRejected, DeadlineExceeded):
+            raise
+        except Exception as e:
+            raise AppException(e, sys)
 
-            logger.info(f"[Session {self.session_id}] Generating response using model: {self.llm}")
+    async def _generate(self) -> "Chatbot":
+        """
+        Fetch context, call the LLM (or a cache) and save the turn, one turn per session at a time.
 
-            # Fetch context from MongoDB
-            context = await mongo.fetch_recent_chats(self.session_id, chat_history_limit)
+        Returns:
+            Chatbot: This instance, with ``response``, ``model`` and ``timings`` filled in.
+        """
+        async with self.app_context.session_locks.hold(self.session_id):
+            self.response = await self._generate_turn()
+            return self
 
-            # Initialize LLM
-            llm_model = ChatGoogleGenerativeAI(model=self.llm, api_key=gemini_api_key)
-            chain = prompt | llm_model | output_parser
+    async def _generate_turn(self) -> str:
+        self._route()
+        self.logger.info(f"[Session {self.session_id}] Generating response using model: {self.model}")
 
-            # Async invocation
-            response = await chain.ainvoke({"input": self.question, "context": context})
+        # Fetch context from MongoDB
+        context = await self._context_within_deadline()
+
+        response = await self._cached_response(context)
+
+        if response is None:
+            # Reuse the pooled client and chain for this model
+            chain = self.app_context.llm_registry.get_chain(self.model)
+
+            # Async invocation, once admitted, within the remaining budget
+            async with self._llm_slot():
+                response = await self.deadline.run(
+                    "llm",
+                    self.app_context.resilience.call(
+                        self.model, lambda: chain.ainvoke({"input": self.question, "context": context})
+                    ),
+                )
 
             if not response or not isinstance(response, str):
-                response = "I'm sorry, I couldn't generate a valid response."
+                response = FALLBACK_RESPONSE
+            else:
+                await self._remember_response(response)
+
+        # Save to DB asynchronously
+        await self._save_within_deadline(response)
+        self._schedule_summary()
+
+        self.logger.info(f"[Session {self.session_id}] Response generated and saved.")
+        return response
+
+    async def stream_response(self) -> AsyncIterator[str]:
+        """
+        Stream the LLM response token by token.
+
+        Chunks are yielded as soon as the model produces them. The assembled
+        answer is saved to MongoDB only once the stream has finished, so a
+        client that disconnects mid-stream does not leave a partial turn behind.
+        """
+        try:
+            if not self.question.strip():
+                raise ClientError("Question cannot be empty.", sys)
+            self.app_context.check_model(self.llm)
+
+            async with self.app_context.session_locks.hold(self.session_id):
+                self._route()
+                self.logger.info(f"[Session {self.session_id}] Streaming response using model: {self.model}")
+
+                context = await self._context_within_deadline()
+
+                response = await self._cached_response(context)
+
+                if response is not None:
+                    yield response
+                else:
+                    chain = self.app_context.llm_registry.get_chain(self.model)
+
+                    chunks = []
+                    async with self._llm_slot():
+                        stream = self.app_context.resilience.stream(
+                            self.model, lambda: chain.astream({"input": self.question, "context": context})
+                        ).__aiter__()
+                        # One budget for the whole stream, so it cannot eat into the save share
+                        llm_expires_at = self.deadline.stage_expires_at("llm")
+                        while True:
+                            try:
+                                chunk = await self.deadline.run("llm", stream.__anext__(), llm_expires_at)
+                            except StopAsyncIteration:
+                                break
+                            if not chunk:
+                                continue
+                            chunks.append(chunk)
+                            yield chunk
+
+                    response = "".join(chunks)
+                    if not response:
+                        response = FALLBACK_RESPONSE
+                        yield response
+                    else:
+                        await self._remember_response(response)
 
-            # Save to DB asynchronously
-            await mongo.save_chat(self.session_id, self.question, response)
+                await self._save_within_deadline(response)
+                self._schedule_summary()
 
-            logger.info(f"[Session {self.session_id}] Response generated and saved.")
-            return response
+                self.logger.info(f"[Session {self.session_id}] Streamed response completed and saved.")
 
+        except (AppException, AdmissionRejected, DeadlineExceeded):
+            raise
         except Exception as e:
-            raise AppException(e, sys)
\ No newline at end of file
+            raise AppException(e, sys)
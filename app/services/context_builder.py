@@ -0,0 +1,78 @@
+import math
+from typing import Dict, List, Optional
+
+# Average characters per token for Gemini/English text; errs on the side of overcounting
+DEFAULT_CHARS_PER_TOKEN = 4.0
+# "User: ", "\nAssistant: " and the newline joining turns
+TURN_OVERHEAD_TOKENS = 6
+
+
+def format_turn(turn: Dict) -> str:
+    """Render one chat turn the way it appears in the prompt context."""
+    return f"User: {turn['user_input']}\nAssistant: {turn['chatbot_response']}"
+
+
+class ContextBuilder:
+    """
+    Assemble prompt context from recent turns within a per-model token budget.
+
+    Tokens are estimated locally from character counts, so there is no
+    tokenizer download or provider round trip and packing the context costs
+    microseconds per request. Turns are added newest first until the next one
+    would exceed the budget.
+    """
+
+    def __init__(
+        self,
+        default_budget: int = 2000,
+        model_budgets: Optional[Dict[str, int]] = None,
+        max_turns: int = 20,
+        chars_per_token: float = DEFAULT_CHARS_PER_TOKEN,
+    ):
+        """
+        Args:
+            default_budget (int): Context token budget for models without an explicit entry.
+            model_budgets (dict): Per-model token budgets keyed by model name.
+            max_turns (int): Maximum number of recent turns considered.
+            chars_per_token (float): Characters assumed per token by the estimator.
+        """
+        self.default_budget = default_budget
+        self.model_budgets = model_budgets or {}
+        self.max_turns = max_turns
+        self.chars_per_token = chars_per_token
+
+    def estimate_tokens(self, text: str) -> int:
+        """Estimate the token count of a piece of text."""
+        if not text:
+            return 0
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def turn_tokens(self, turn: Dict) -> int:
+        """Estimate the tokens a turn adds to the context."""
+        return (
+            self.estimate_tokens(turn.get("user_input", ""))
+            + self.estimate_tokens(turn.get("chatbot_response", ""))
+            + TURN_OVERHEAD_TOKENS
+        )
+
+    def budget_for(self, model: str) -> int:
+        """Return the context token budget for a model."""
+        return self.model_budgets.get(model, self.default_budget)
+
+    def select_turns(self, turns: List[Dict], model: str) -> List[Dict]:
+        """Return the newest turns (oldest first) that fit in the model's budget."""
+        budget = self.budget_for(model)
+        selected = []
+        used = 0
+        for turn in reversed(turns[-self.max_turns:]):
+            cost = self.turn_tokens(turn)
+            if used + cost > budget:
+                break
+            selected.append(turn)
+            used += cost
+        selected.reverse()
+        return selected
+
+    def build(self, turns: List[Dict], model: str) -> str:
+        """Render the budgeted context string for a model."""
+        return "\n".join(format_turn(turn) for turn in self.select_turns(turns, model))
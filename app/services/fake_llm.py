@@ -0,0 +1,98 @@
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeProviderError(Exception):
+    """Simulated transient provider failure."""
+
+    is_retryable = True
+    code = 503
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic offline chat model for load tests and benchmarks.
+
+    Each answer waits ``latency_seconds`` before its first token and then
+    produces ``response_tokens`` words at ``tokens_per_second``. A seeded
+    random generator fails a fraction ``error_rate`` of calls with
+    ``FakeProviderError``, so a run is reproducible for a given seed and
+    request order. Answer text depends only on the model and the prompt.
+    """
+
+    model: str = "fake"
+    latency_seconds: float = 0.2
+    tokens_per_second: float = 50.0
+    response_tokens: int = 40
+    error_rate: float = 0.0
+    seed: int = 0
+    rng: Any = None
+
+    def model_post_init(self, __context: Any) -> None:
+        self.rng = random.Random(f"{self.seed}:{self.model}")
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _words(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = hashlib.sha256(f"{self.model}\n{prompt}".encode("utf-8")).hexdigest()
+        words = [f"Simulated answer {digest[:8]} from {self.model}:"]
+        words += [f"token{i}" for i in range(max(0, self.response_tokens - len(words[0].split())))]
+        return words
+
+    def _should_fail(self) -> bool:
+        return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        text = "".join(chunk.text for chunk in self._stream(messages, stop, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        failing = self._should_fail()
+        time.sleep(self.latency_seconds)
+        if failing:
+            raise FakeProviderError(f"Simulated failure from {self.model}.")
+
+        delay = self._token_delay()
+        for i, word in enumerate(self._words(messages)):
+            if i and delay:
+                time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager is not None:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        failing = self._should_fail()
+        await asyncio.sleep(self.latency_seconds)
+        if failing:
+            raise FakeProviderError(f"Simulated failure from {self.model}.")
+
+        delay = self._token_delay()
+        for i, word in enumerate(self._words(messages)):
+            if i and delay:
+                await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        text = "".join([chunk.text async for chunk in self._astream(messages, stop, **kwargs)])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
@@ -0,0 +1,116 @@
+import os
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Optional
+
+from app.core.logger import setup_logger
+
+if TYPE_CHECKING:
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+logger = setup_logger(name="LLMProviders", log_file_name="llm_registry.log")
+
+
+class LLMProvider(ABC):
+    """
+    Builds chat models for a backend.
+
+    ``LLMRegistry`` asks its provider for one client per model name and
+    closes it through the provider when the model is evicted.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def build(self, model_name: str) -> "BaseChatModel":
+        """Create the chat model client for ``model_name``."""
+
+    async def close(self, llm: "BaseChatModel") -> None:
+        """Release the client's connections, if it holds any."""
+        aclose = getattr(llm, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through ``ChatGoogleGenerativeAI``."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None, max_retries: Optional[int] = None, base_url: Optional[str] = None):
+        """
+        Args:
+            api_key (str): Google Gemini API key; read from ``GOOGLE_API_KEY`` when omitted.
+            max_retries (int): Attempts made by the client itself; None keeps the client default.
+            base_url (str): Alternative API endpoint, e.g. a local fake server.
+        """
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not self.api_key:
+            raise EnvironmentError("GOOGLE_API_KEY is missing in the .env file")
+        self.max_retries = max_retries
+        self.base_url = base_url
+
+    def build(self, model_name: str) -> "BaseChatModel":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        options = {}
+        if self.max_retries is not None:
+            options["max_retries"] = self.max_retries
+        if self.base_url:
+            options["base_url"] = self.base_url
+        return ChatGoogleGenerativeAI(model=model_name, api_key=self.api_key, **options)
+
+
+class FakeProvider(LLMProvider):
+    """Local simulated backend; needs no network or API key."""
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.2,
+        tokens_per_second: float = 50.0,
+        response_tokens: int = 40,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.options = {
+            "latency_seconds": latency_seconds,
+            "tokens_per_second": tokens_per_second,
+            "response_tokens": response_tokens,
+            "error_rate": error_rate,
+            "seed": seed,
+        }
+
+    def build(self, model_name: str) -> "BaseChatModel":
+        from app.services.fake_llm import FakeChatModel
+
+        return FakeChatModel(model=model_name, **self.options)
+
+
+def build_provider(provider_params: dict, client_max_retries: Optional[int] = None) -> LLMProvider:
+    """
+    Build the configured provider. ``LLM_PROVIDER`` in the environment
+    overrides ``provider_params["name"]``.
+
+    Args:
+        provider_params (dict): The ``chatbot.provider`` config section.
+        client_max_retries (int): Attempts made inside the Gemini client itself.
+    """
+    name = os.getenv("LLM_PROVIDER") or provider_params.get("name", "gemini")
+    logger.info("Using LLM provider: %s", name)
+
+    if name == "gemini":
+        return GeminiProvider(
+            max_retries=client_max_retries,
+            base_url=os.getenv("GEMINI_BASE_URL"),
+        )
+    if name == "fake":
+        fake_params = provider_params.get("fake", {})
+        return FakeProvider(
+            latency_seconds=fake_params.get("latency_seconds", 0.2),
+            tokens_per_second=fake_params.get("tokens_per_second", 50.0),
+            response_tokens=fake_params.get("response_tokens", 40),
+            error_rate=fake_params.get("error_rate", 0.0),
+            seed=fake_params.get("seed", 0),
+        )
+    raise ValueError(f"Unknown LLM provider: {name}")
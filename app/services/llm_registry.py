@@ -0,0 +1,152 @@
+import sys
+import time
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+from app.core.logger import setup_logger
+from app.core.exception import ProviderError
+from app.services.llm_providers import LLMProvider
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import Runnable
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+logger = setup_logger(name="LLMRegistry", log_file_name="llm_registry.log")
+
+
+class _RegistryEntry:
+    """A cached LLM client together with the chain built on top of it."""
+
+    __slots__ = ("llm", "chain", "last_used")
+
+    def __init__(self, llm: "BaseChatModel", chain: "Runnable"):
+        self.llm = llm
+        self.chain = chain
+        self.last_used = time.monotonic()
+
+
+class LLMRegistry:
+    """
+    Registry of reusable LLM clients and chains keyed by model name.
+
+    Each model's client (and therefore its HTTP connection pool) is built once,
+    on first use or during warm-up, and shared by every request. Models that have
+    not been used for ``idle_ttl_seconds`` are closed and evicted by a background
+    sweeper so rarely used models do not hold connections open forever.
+    """
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        prompt: "Runnable",
+        output_parser: "Runnable",
+        idle_ttl_seconds: float = 900,
+        sweep_interval_seconds: float = 60,
+    ):
+        """
+        Args:
+            provider (LLMProvider): Backend that builds the model clients.
+            prompt (Runnable): Prompt template placed in front of every model.
+            output_parser (Runnable): Parser placed after every model.
+            idle_ttl_seconds (float): Idle time after which a model is evicted.
+            sweep_interval_seconds (float): How often the sweeper checks for idle models.
+        """
+        self.provider = provider
+        self.prompt = prompt
+        self.output_parser = output_parser
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+        self._entries: Dict[str, _RegistryEntry] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _build(self, model_name: str) -> _RegistryEntry:
+        """Build a new client and chain for the given model."""
+        try:
+            logger.info("Building LLM client for model: %s", model_name)
+            llm = self.provider.build(model_name)
+            chain = self.prompt | llm | self.output_parser
+            return _RegistryEntry(llm, chain)
+        except Exception as e:
+            logger.error("Failed to build LLM client for %s: %s", model_name, e)
+            raise ProviderError(e, sys)
+
+    def _get_entry(self, model_name: str) -> _RegistryEntry:
+        entry = self._entries.get(model_name)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(model_name)
+                if entry is None:
+                    entry = self._build(model_name)
+                    self._entries[model_name] = entry
+        entry.last_used = time.monotonic()
+        return entry
+
+    def get_chain(self, model_name: str) -> "Runnable":
+        """Return the cached chain for ``model_name``, building it on first use."""
+        return self._get_entry(model_name).chain
+
+    def get_model(self, model_name: str) -> "BaseChatModel":
+        """Return the cached client for ``model_name``, for callers composing their own chains."""
+        return self._get_entry(model_name).llm
+
+    def warmup(self, model_names: Iterable[str]) -> None:
+        """Eagerly build clients for the given models (e.g. at startup)."""
+        for model_name in model_names:
+            self.get_chain(model_name)
+
+    async def evict_idle(self) -> int:
+        """Close and remove models idle for longer than the TTL. Returns the count evicted."""
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        with self._lock:
+            idle = [name for name, entry in self._entries.items() if entry.last_used < cutoff]
+            evicted = [(name, self._entries.pop(name)) for name in idle]
+
+        for name, entry in evicted:
+            await self._close_entry(name, entry)
+        return len(evicted)
+
+    async def _close_entry(self, model_name: str, entry: _RegistryEntry) -> None:
+        try:
+            await self.provider.close(entry.llm)
+            logger.info("Evicted LLM client for model: %s", model_name)
+        except Exception as e:
+            logger.warning("Error closing LLM client for %s: %s", model_name, e)
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                await self.evict_idle()
+            except Exception as e:
+                logger.error("Idle model sweep failed: %s", e)
+
+    def start(self) -> None:
+        """Start the background idle-model sweeper on the running event loop."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def close(self) -> None:
+        """Stop the sweeper and close every cached client."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+
+        for name, entry in entries:
+            await self._close_entry(name, entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, model_name: str) -> bool:
+        return model_name in self._entries
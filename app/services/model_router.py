@@ -0,0 +1,124 @@
+import time
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from app.core.logger import setup_logger
+from app.core.deadline import DeadlineExceeded
+from app.services.admission import AdmissionRejected
+
+logger = setup_logger(name="ModelRouter", log_file_name="model_router.log")
+
+
+class _ModelStats:
+    """Outcomes of one model's recent calls as (finished_at, latency, error) samples."""
+
+    __slots__ = ("samples",)
+
+    def __init__(self):
+        self.samples = deque()
+
+    def prune(self, cutoff: float) -> None:
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    def error_rate(self) -> float:
+        return sum(1 for _, _, error in self.samples if error) / len(self.samples)
+
+    def p95(self) -> float:
+        latencies = sorted(latency for _, latency, _ in self.samples)
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+
+class ModelRouter:
+    """
+    Route requests away from models that are currently slow or failing.
+
+    Every call's latency and outcome is recorded per model over a sliding
+    ``window_seconds``. A model with at least ``min_samples`` recent calls is
+    considered degraded when its error rate exceeds ``max_error_rate`` or its
+    p95 latency exceeds ``max_p95_seconds``, or when ``is_open`` reports its
+    circuit open. Requests for a degraded model go to its first healthy
+    fallback. Samples age out of the window, so a degraded model is tried
+    again once its window has emptied.
+    """
+
+    def __init__(
+        self,
+        fallbacks: Optional[Dict[str, List[str]]] = None,
+        window_seconds: float = 60,
+        min_samples: int = 10,
+        max_error_rate: float = 0.5,
+        max_p95_seconds: float = 20,
+        is_open: Optional[Callable[[str], bool]] = None,
+    ):
+        self.fallbacks = fallbacks or {}
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.max_p95_seconds = max_p95_seconds
+        self.is_open = is_open
+
+        self._stats: Dict[str, _ModelStats] = {}
+        self.rerouted = 0
+
+    def _model_stats(self, model: str) -> _ModelStats:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats[model] = _ModelStats()
+        stats.prune(time.monotonic() - self.window_seconds)
+        return stats
+
+    def record(self, model: str, latency: float, error: bool = False) -> None:
+        self._model_stats(model).samples.append((time.monotonic(), latency, error))
+
+    @contextmanager
+    def track(self, model: str):
+        """Record the latency and outcome of the call made inside the block."""
+        started = time.monotonic()
+        try:
+            yield
+        except (asyncio.CancelledError, AdmissionRejected):
+            # Outcome unknown, or the call never reached the model
+            raise
+        except DeadlineExceeded:
+            # Not the model's error (clients choose their timeout), but the time it took is
+            # a lower bound on its latency, so a hanging model still trips the p95 rule
+            self.record(model, time.monotonic() - started)
+            raise
+        except Exception:
+            self.record(model, time.monotonic() - started, error=True)
+            raise
+        self.record(model, time.monotonic() - started)
+
+    def healthy(self, model: str) -> bool:
+        if self.is_open is not None and self.is_open(model):
+            return False
+        stats = self._model_stats(model)
+        if len(stats.samples) < self.min_samples:
+            return True
+        return stats.error_rate() <= self.max_error_rate and stats.p95() <= self.max_p95_seconds
+
+    def route(self, model: str) -> str:
+        """Return the model to serve a request for ``model`` with."""
+        if self.healthy(model):
+            return model
+        for fallback in self.fallbacks.get(model, []):
+            if self.healthy(fallback):
+                self.rerouted += 1
+                logger.warning("Model %s is degraded, routing to %s.", model, fallback)
+                return fallback
+        return model
+
+    def stats(self) -> dict:
+        models = {}
+        for model in list(self._stats):
+            stats = self._model_stats(model)
+            models[model] = {
+                "healthy": self.healthy(model),
+                "samples": len(stats.samples),
+                "error_rate": stats.error_rate() if stats.samples else None,
+                "p95_seconds": stats.p95() if stats.samples else None,
+            }
+        return {"rerouted": self.rerouted, "models": models}
@@ -0,0 +1,306 @@
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from app.core.logger import setup_logger
+from app.services.admission import AdmissionRejected
+
+logger = setup_logger(name="Resilience", log_file_name="resilience.log")
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(AdmissionRejected):
+    """Raised without calling the provider while a model's circuit is open."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(
+            f"Model {model} is temporarily unavailable, please retry later.",
+            status_code=503,
+            retry_after=max(1, int(retry_after + 0.5)),
+        )
+        self.model = model
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Return True for provider errors that another attempt may get past (rate limits, 5xx, network)."""
+    # Imported on the error path only; the HTTP clients have loaded it by then
+    import httpx
+
+    if getattr(exc, "is_retryable", False):
+        return True
+    if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return code in TRANSIENT_STATUS_CODES
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one model.
+
+    After ``failure_threshold`` transient failures in a row the circuit opens
+    and calls fail fast for ``reset_timeout_seconds``. Then a single trial call
+    is let through (half-open): success closes the circuit, failure opens it
+    again for another period.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout_seconds - time.monotonic())
+
+    def is_open(self) -> bool:
+        """Whether calls are currently failing fast; False once the trial call is due."""
+        return self.state == self.OPEN and self.retry_after() > 0
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; claims the trial call when half-open."""
+        if self.state == self.OPEN:
+            if self.retry_after() > 0:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give up a claimed trial call without an outcome (e.g. the caller was cancelled)."""
+        self._trial_in_flight = False
+
+
+class LatencyWindow:
+    """Rolling window of recent successful call latencies."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientCaller:
+    """
+    Retries, hedging and circuit breaking around calls to the LLM provider.
+
+    Transient failures are retried up to ``max_attempts`` times with full
+    jitter backoff. With hedging enabled, a second identical request is sent
+    when the first has not answered after the model's recent p95 latency (or
+    ``hedge_delay_seconds`` until enough samples exist); whichever answers
+    first wins and the other is cancelled. Each model has its own circuit
+    breaker so an outage fails fast instead of every request waiting out its
+    retries. Non-transient errors (bad request, auth) are raised immediately
+    and do not count against the circuit.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay_seconds: float = 0.5,
+        max_delay_seconds: float = 4.0,
+        hedge_enabled: bool = False,
+        hedge_delay_seconds: float = 2.0,
+        hedge_min_samples: int = 20,
+        latency_window: int = 200,
+        failure_threshold: int = 5,
+        reset_timeout_seconds: float = 30,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_delay_seconds = hedge_delay_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self.latency_window = latency_window
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyWindow] = {}
+
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.short_circuited = 0
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout_seconds)
+        return breaker
+
+    def _window(self, model: str) -> LatencyWindow:
+        window = self._latencies.get(model)
+        if window is None:
+            window = self._latencies[model] = LatencyWindow(self.latency_window)
+        return window
+
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait for the first request before sending a hedged one."""
+        window = self._window(model)
+        if len(window) < self.hedge_min_samples:
+            return self.hedge_delay_seconds
+        return window.percentile(0.95)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number ``attempt`` (1-based)."""
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** (attempt - 1)))
+
+    def _admit(self, model: str) -> CircuitBreaker:
+        breaker = self.breaker(model)
+        if not breaker.allow():
+            self.short_circuited += 1
+            raise CircuitOpenError(model, breaker.retry_after())
+        return breaker
+
+    async def _timed(self, model: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.monotonic()
+        result = await fn()
+        self._window(model).add(time.monotonic() - started)
+        return result
+
+    async def _hedged(self, model: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn``, racing a second copy against it if the first is slow."""
+        primary = asyncio.ensure_future(self._timed(model, fn))
+        if not self.hedge_enabled:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(model))
+            if not done:
+                self.hedges += 1
+                tasks.add(asyncio.ensure_future(self._timed(model, fn)))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if not primary.done():
+                primary.cancel()
+
+    async def call(self, model: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Call the provider through the circuit breaker, retrying transient errors.
+
+        Args:
+            model (str): Model name, used to pick the circuit and latency window.
+            fn (Callable): Zero-argument factory returning a fresh awaitable per attempt.
+
+        Raises:
+            CircuitOpenError: If the model's circuit is open.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            breaker = self._admit(model)
+            try:
+                result = await self._hedged(model, fn)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                if not is_transient_error(e):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if attempt == self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+                self.retries += 1
+                logger.warning("Transient error from %s (attempt %d/%d), retrying in %.2fs: %s",
+                               model, attempt, self.max_attempts, delay, e)
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+
+    async def stream(self, model: str, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Stream from the provider through the circuit breaker.
+
+        Transient errors are retried only until the first chunk arrives; once
+        output has been sent on, a failure is raised to the caller as is.
+        Streams are never hedged.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            breaker = self._admit(model)
+            started = False
+            try:
+                async for chunk in fn():
+                    started = True
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                breaker.release()
+                raise
+            except Exception as e:
+                if not is_transient_error(e):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if started or attempt == self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+                self.retries += 1
+                logger.warning("Transient error opening stream from %s (attempt %d/%d), retrying in %.2fs: %s",
+                               model, attempt, self.max_attempts, delay, e)
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return
+
+    def stats(self) -> dict:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "short_circuited": self.short_circuited,
+            "circuits": {
+                model: {"state": breaker.state, "consecutive_failures": breaker.failures}
+                for model, breaker in self._breakers.items()
+            },
+            "p95_seconds": {model: window.percentile(0.95) for model, window in self._latencies.items()},
+        }
@@ -0,0 +1,216 @@
+import os
+import time
+import asyncio
+import hashlib
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.logger import setup_logger
+
+logger = setup_logger(name="ResponseCache", log_file_name="response_cache.log")
+
+
+def make_cache_key(model: str, rendered_prompt: str) -> str:
+    """Hash a model name and fully rendered prompt into a cache key."""
+    digest = hashlib.sha256(f"{model}\x00{rendered_prompt}".encode("utf-8")).hexdigest()
+    return f"chat:{digest}"
+
+
+class CacheBackend(ABC):
+    """Interface for response cache storage backends."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None when it is missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        """Store a value that expires after ``ttl_seconds``."""
+
+    async def close(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return 0
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Per-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheBackend(CacheBackend):
+    """
+    SQLite-backed cache shared by every worker on the same host.
+
+    Queries run in a worker thread so the event loop never blocks on disk.
+    Once ``max_entries`` is exceeded the entries closest to expiry are removed.
+    """
+
+    def __init__(self, path: str = "cache/responses.sqlite3", max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_expiry ON responses (expires_at)")
+        self._lock = asyncio.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl_seconds: float) -> None:
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl_seconds),
+        )
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    async def get(self, key: str) -> Optional[str]:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._set, key, value, ttl_seconds)
+
+    async def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis (or any Redis-compatible store) backend shared across tasks.
+
+    Size limits are left to the server's ``maxmemory`` eviction policy.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError("The redis response cache backend requires the 'redis' package (the 'redis' extra).") from e
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        await self._client.set(key, value, ex=max(1, int(ttl_seconds)))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class ResponseCache:
+    """
+    Exact-match cache of LLM responses keyed by model and rendered prompt.
+
+    Backend failures never fail a request: they are logged, counted and
+    treated as a miss.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: float = 3600):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Response cache read failed: %s", e)
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        try:
+            await self.backend.set(key, value, self.ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Response cache write failed: %s", e)
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def build_response_cache(cache_params: dict) -> Optional[ResponseCache]:
+    """Create the response cache described by the ``response_cache`` config section."""
+    if not cache_params.get("enabled", True):
+        return None
+
+    backend_name = cache_params.get("backend", "memory")
+    if backend_name == "memory":
+        backend = InMemoryCacheBackend(max_entries=cache_params.get("max_entries", 10000))
+    elif backend_name == "disk":
+        backend = DiskCacheBackend(
+            path=cache_params.get("disk_path", "cache/responses.sqlite3"),
+            max_entries=cache_params.get("max_entries", 10000),
+        )
+    elif backend_name == "redis":
+        backend = RedisCacheBackend(os.getenv("REDIS_URL", cache_params.get("redis_url", "redis://localhost:6379/0")))
+    else:
+        raise ValueError(f"Unknown response cache backend: {backend_name}")
+
+    logger.info("Response cache enabled with %s backend.", backend_name)
+    return ResponseCache(backend, ttl_seconds=cache_params.get("ttl_seconds", 3600))
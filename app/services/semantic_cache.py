@@ -0,0 +1,179 @@
+import time
+import asyncio
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.logger import setup_logger
+
+logger = setup_logger(name="SemanticCache", log_file_name="semantic_cache.log")
+
+
+class LocalEmbedder:
+    """
+    CPU sentence embedder backed by ``fastembed`` (ONNX runtime, no GPU or network at query time).
+
+    The model is loaded on first use and embeddings are computed in a worker
+    thread so the event loop is never blocked. Vectors are L2-normalised, so
+    cosine similarity is a plain dot product.
+    """
+
+    def __init__(self, model_name: str = "BAAI/bge-small-en-v1.5"):
+        self.model_name = model_name
+        self._model = None
+
+    def _load(self):
+        if self._model is None:
+            try:
+                from fastembed import TextEmbedding
+            except ImportError as e:
+                raise ImportError("The semantic cache requires the 'fastembed' package.") from e
+            logger.info("Loading embedding model: %s", self.model_name)
+            self._model = TextEmbedding(model_name=self.model_name)
+        return self._model
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(next(iter(self._load().embed([text]))), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def embed(self, text: str) -> np.ndarray:
+        return await asyncio.to_thread(self._embed, text)
+
+
+class VectorIndex:
+    """
+    Fixed-capacity brute-force cosine index over normalised vectors.
+
+    Vectors live in one preallocated float32 matrix, so a lookup is a single
+    matrix-vector product. When full, the least recently used entry is
+    replaced; expired entries are ignored by searches and reused first.
+    """
+
+    def __init__(self, dim: int, capacity: int, ttl_seconds: float):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._answers: List[Optional[str]] = [None] * capacity
+        self._expires_at = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._size = 0
+
+    def search(self, vector: np.ndarray) -> tuple:
+        """Return ``(answer, similarity)`` of the nearest live entry, or ``(None, 0.0)``."""
+        if self._size == 0:
+            return None, 0.0
+
+        scores = self._vectors[:self._size] @ vector
+        scores[self._expires_at[:self._size] <= time.monotonic()] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < 0:
+            return None, 0.0
+
+        self._last_used[best] = time.monotonic()
+        return self._answers[best], float(scores[best])
+
+    def add(self, vector: np.ndarray, answer: str) -> None:
+        now = time.monotonic()
+        if self._size < self.capacity:
+            slot = self._size
+            self._size += 1
+        else:
+            expired = np.flatnonzero(self._expires_at <= now)
+            slot = int(expired[0]) if expired.size else int(np.argmin(self._last_used))
+
+        self._vectors[slot] = vector
+        self._answers[slot] = answer
+        self._expires_at[slot] = now + self.ttl_seconds
+        self._last_used[slot] = now
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class SemanticCache:
+    """
+    Serve cached answers for paraphrased questions.
+
+    Questions are embedded locally and matched against previously answered
+    questions of the same model (one index per model namespace). A cached
+    answer is returned when cosine similarity reaches ``threshold``.
+    """
+
+    def __init__(
+        self,
+        embedder: LocalEmbedder,
+        threshold: float = 0.92,
+        max_entries_per_model: int = 5000,
+        ttl_seconds: float = 3600,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries_per_model = max_entries_per_model
+        self.ttl_seconds = ttl_seconds
+
+        self._indexes: Dict[str, VectorIndex] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _index(self, model: str, dim: int) -> VectorIndex:
+        index = self._indexes.get(model)
+        if index is None:
+            index = self._indexes[model] = VectorIndex(dim, self.max_entries_per_model, self.ttl_seconds)
+        return index
+
+    async def lookup(self, model: str, question: str) -> tuple:
+        """
+        Find a cached answer for a semantically equivalent question.
+
+        Returns:
+            tuple: ``(answer or None, question embedding or None)``; pass the
+            embedding back to ``store`` to avoid embedding the question twice.
+        """
+        try:
+            vector = await self.embedder.embed(question)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Semantic cache embedding failed: %s", e)
+            return None, None
+
+        index = self._indexes.get(model)
+        answer, score = index.search(vector) if index is not None else (None, 0.0)
+        if answer is not None and score >= self.threshold:
+            self.hits += 1
+            logger.debug("Semantic cache hit for model %s (similarity %.3f).", model, score)
+            return answer, vector
+
+        self.misses += 1
+        return None, vector
+
+    def store(self, model: str, vector: Optional[np.ndarray], answer: str) -> None:
+        """Remember an answer under the question's embedding."""
+        if vector is None:
+            return
+        self._index(model, vector.shape[0]).add(vector, answer)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": {model: len(index) for model, index in self._indexes.items()},
+        }
+
+
+def build_semantic_cache(cache_params: dict) -> Optional[SemanticCache]:
+    """Create the semantic cache described by the ``semantic_cache`` config section."""
+    if not cache_params.get("enabled", False):
+        return None
+
+    logger.info("Semantic cache enabled (threshold %.2f).", cache_params.get("threshold", 0.92))
+    return SemanticCache(
+        LocalEmbedder(cache_params.get("embedding_model", "BAAI/bge-small-en-v1.5")),
+        threshold=cache_params.get("threshold", 0.92),
+        max_entries_per_model=cache_params.get("max_entries_per_model", 5000),
+        ttl_seconds=cache_params.get("ttl_seconds", 3600),
+    )
@@ -0,0 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class _SessionLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class SessionLocks:
+    """
+    Per-session asyncio locks that serialize turns within one worker.
+
+    Requests for the same session run one at a time (read history, answer,
+    save), while different sessions never wait on each other. A session's lock
+    is discarded as soon as nobody holds or waits for it, so memory use tracks
+    the number of active sessions.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, _SessionLock] = {}
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = _SessionLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._locks[session_id]
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -0,0 +1,191 @@
+import time
+import asyncio
+import contextvars
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.logger import setup_logger
+from app.services.context_builder import format_turn
+
+logger = setup_logger(name="ConversationSummarizer", log_file_name="summarizer.log")
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the new turns into the existing summary. Keep facts, names, preferences and "
+    "open questions; drop pleasantries. Reply with the updated summary only, "
+    "in at most {max_words} words."
+)
+SUMMARY_USER_PROMPT = "Existing summary:\n{summary}\n\nNew turns:\n{turns}"
+
+
+def after_summary(turn: Dict, summary: Dict) -> bool:
+    """
+    Return True if ``turn`` is newer than the newest turn folded into ``summary``.
+
+    Sequence numbers are compared when both sides have one; turn ids (ObjectIds,
+    only ordered to the second across workers) are the fallback for turns saved
+    without a sequence number.
+    """
+    if summary.get("summarized_until_seq") is not None and turn.get("seq") is not None:
+        return turn["seq"] > summary["summarized_until_seq"]
+    if summary.get("summarized_until") is None:
+        return True
+    return turn["turn_id"] > summary["summarized_until"]
+
+
+class ConversationSummarizer:
+    """
+    Background rolling summarizer for turns that have aged out of the context window.
+
+    ``schedule`` only records the aged-out turns and returns; a worker task
+    folds them into the session's stored summary with an LLM call, so
+    summarization never runs on the request path. Each summary remembers the
+    newest turn it covers (``summarized_until`` and its sequence number), which
+    keeps updates incremental: every turn is summarized once. Recently used
+    summaries are kept in a small in-process LRU so reading them is usually free.
+    """
+
+    def __init__(
+        self,
+        mongo,
+        llm_registry,
+        model: str = "gemini-2.5-flash",
+        max_words: int = 200,
+        max_pending_sessions: int = 1000,
+        cache_size: int = 1000,
+        cache_ttl_seconds: float = 300,
+        timeout_seconds: float = 60,
+    ):
+        """
+        Args:
+            mongo (AsyncMongoDatabase): Database used to load and store summaries.
+            llm_registry (LLMRegistry): Source of pooled LLM clients.
+            model (str): Model used to write summaries.
+            max_words (int): Target maximum summary length.
+            max_pending_sessions (int): Sessions that may wait for summarization before new work is dropped.
+            cache_size (int): Number of summaries kept in memory.
+            cache_ttl_seconds (float): How long a cached summary is trusted.
+            timeout_seconds (float): Limit on one summary call, so a hung call cannot stall the worker.
+        """
+        self.mongo = mongo
+        self.llm_registry = llm_registry
+        self.model = model
+        self.max_words = max_words
+        self.max_pending_sessions = max_pending_sessions
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.timeout_seconds = timeout_seconds
+
+        self._pending: Dict[str, List[Dict]] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._worker: Optional[asyncio.Task] = None
+        self._prompt = None
+
+    def _chain(self):
+        # LangChain is imported with the first summary, not at startup
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_core.output_parsers import StrOutputParser
+
+        if self._prompt is None:
+            self._prompt = ChatPromptTemplate.from_messages(
+                [("system", SUMMARY_SYSTEM_PROMPT), ("user", SUMMARY_USER_PROMPT)]
+            )
+        return self._prompt | self.llm_registry.get_model(self.model) | StrOutputParser()
+
+    def _cache_put(self, session_id: str, summary: dict) -> None:
+        self._cache[session_id] = (summary, time.monotonic() + self.cache_ttl_seconds)
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def get_summary(self, session_id: str) -> dict:
+        """Return ``{"summary", "summarized_until", "summarized_until_seq"}`` for a session."""
+        cached = self._cache.get(session_id)
+        if cached is not None and cached[1] > time.monotonic():
+            self._cache.move_to_end(session_id)
+            return cached[0]
+
+        summary = await self.mongo.fetch_summary(session_id)
+        self._cache_put(session_id, summary)
+        return summary
+
+    def schedule(self, session_id: str, turns: List[Dict]) -> None:
+        """Queue turns that left the context window for summarization (non-blocking)."""
+        if not turns:
+            return
+
+        pending = self._pending.get(session_id)
+        if pending is None:
+            if len(self._pending) >= self.max_pending_sessions:
+                logger.warning("Summarizer backlog full, skipping session_id: %s", session_id)
+                return
+            pending = self._pending[session_id] = []
+            self._queue.put_nowait(session_id)
+
+        known = {turn["turn_id"] for turn in pending}
+        pending.extend(turn for turn in turns if turn["turn_id"] not in known)
+        self.start()
+
+    async def _summarize(self, session_id: str) -> None:
+        turns = self._pending.pop(session_id, [])
+        current = await self.get_summary(session_id)
+
+        turns = [turn for turn in turns if after_summary(turn, current)]
+        if not turns:
+            return
+
+        summary = await asyncio.wait_for(
+            self._chain().ainvoke({
+                "summary": current["summary"] or "(none yet)",
+                "turns": "\n".join(format_turn(turn) for turn in turns),
+                "max_words": self.max_words,
+            }),
+            self.timeout_seconds,
+        )
+
+        updated = {
+            "summary": summary.strip(),
+            "summarized_until": turns[-1]["turn_id"],
+            "summarized_until_seq": turns[-1].get("seq"),
+        }
+        await self.mongo.save_summary(
+            session_id, updated["summary"], updated["summarized_until"], updated["summarized_until_seq"]
+        )
+        self._cache_put(session_id, updated)
+        logger.info("Folded %d turn(s) into summary for session_id: %s", len(turns), session_id)
+
+    async def _run(self) -> None:
+        while True:
+            session_id = await self._queue.get()
+            try:
+                await self._summarize(session_id)
+            except asyncio.TimeoutError:
+                logger.error("Summarization timed out after %ss for session_id %s",
+                             self.timeout_seconds, session_id)
+            except Exception as e:
+                logger.error("Summarization failed for session_id %s: %s", session_id, e)
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        """Start the background worker on the running event loop."""
+        if self._worker is None or self._worker.done():
+            # Run in an empty context: when started lazily from a request, the worker must
+            # not inherit (and log every later record with) that request's id
+            self._worker = contextvars.Context().run(asyncio.create_task, self._run())
+
+    async def close(self, timeout: float = 10) -> None:
+        """Give queued summaries up to ``timeout`` seconds to finish, then stop the worker."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Summarizer stopped with %d session(s) still pending.", len(self._pending))
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
@@ -0,0 +1,268 @@
+"""
+Load-test and benchmark the /chat path end to end.
+
+Usage:
+    python -m app.tests.benchmark_chat [--requests 200] [--concurrency 16] [--stream]
+        [--mongo mock|real] [--llm-latency 0.2] [--token-rate 50] [--error-rate 0]
+        [--save benchmarks/baseline.json] [--compare benchmarks/baseline.json]
+
+The FastAPI app is served by uvicorn on a background thread of this process
+(so responses really stream over HTTP), answering with the deterministic
+fake LLM provider. With ``--mongo mock`` (the default) history lives in
+mongomock-motor, so no network or API key is needed; ``--mongo real`` uses
+``MONGO_URI``. Reports throughput, p50/p95/p99 latency, time to first
+token (``--stream``) and a per-stage breakdown taken from the ``Server-Timing``
+header (or the stream's ``done`` event). ``--save`` writes the results as a
+JSON baseline; ``--compare`` prints the change against one and exits non-zero
+when a latency percentile regresses by more than ``--tolerance``.
+"""
+import os
+import sys
+import copy
+import json
+import time
+import asyncio
+import argparse
+import platform
+import threading
+import subprocess
+from collections import Counter, defaultdict
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+
+def summarize(values: list) -> dict:
+    return {"p50": percentile(values, 0.50), "p95": percentile(values, 0.95), "p99": percentile(values, 0.99)}
+
+
+def parse_server_timing(header: str) -> dict:
+    timings = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, duration = entry.partition(";dur=")
+        if duration:
+            timings[name] = float(duration)
+    return timings
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def prepare_environment(args) -> None:
+    """Point the app at the fake provider (and mongomock) before it is imported."""
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+    if args.mongo == "mock":
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+
+async def one_request(client, args, index: int) -> dict:
+    payload = {
+        "question": f"Benchmark question {index}",
+        "model": args.model,
+        "session_id": f"bench-{index % args.sessions}",
+    }
+    started = time.perf_counter()
+    result = {"status": None, "latency_ms": None, "ttft_ms": None, "timings": {}}
+
+    if not args.stream:
+        response = await client.post("/chat", json=payload)
+        result["status"] = response.status_code
+        result["timings"] = parse_server_timing(response.headers.get("server-timing", ""))
+    else:
+        async with client.stream("POST", "/chat/stream", json=payload) as response:
+            result["status"] = response.status_code
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event is None and result["ttft_ms"] is None:
+                        result["ttft_ms"] = (time.perf_counter() - started) * 1000
+                    elif event == "done":
+                        result["timings"] = data.get("timings_ms", {})
+                    elif event == "error":
+                        result["status"] = data.get("status", 500)
+                    event = None
+
+    result["latency_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def wait_until_ready(base_url: str, timeout: float = 60) -> None:
+    """Poll ``/ready`` until the app has finished its background startup."""
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while httpx.get(f"{base_url}/ready").status_code != 200:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Benchmark server did not become ready.")
+        time.sleep(0.05)
+
+
+class AppServer:
+    """Serves the app with uvicorn on a background thread, on a free local port."""
+
+    def __init__(self, app):
+        import uvicorn
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Benchmark server failed to start.")
+            time.sleep(0.05)
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_ready(base_url)
+        return base_url
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+
+async def drive(base_url: str, args) -> dict:
+    import httpx
+
+    results = []
+    counter = iter(range(args.warmup + args.requests))
+    measured_from = []
+
+    async def worker(client):
+        for index in counter:
+            if index == args.warmup:
+                measured_from.append(time.perf_counter())
+            result = await one_request(client, args, index)
+            if index >= args.warmup:
+                results.append(result)
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        # Measured from the first request after warm-up (a few warm-up requests may still overlap it)
+        elapsed = time.perf_counter() - measured_from[0]
+
+    ok = [r for r in results if r["status"] == 200]
+    stages = defaultdict(list)
+    for result in ok:
+        for stage, millis in result["timings"].items():
+            stages[stage].append(millis)
+
+    return {
+        "requests": len(results),
+        "succeeded": len(ok),
+        "status_codes": dict(Counter(str(r["status"]) for r in results)),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "latency_ms": summarize([r["latency_ms"] for r in ok]),
+        "ttft_ms": summarize([r["ttft_ms"] for r in ok if r["ttft_ms"] is not None]),
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(stages.items())},
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print the change against ``baseline``; return False if latency regressed beyond ``tolerance``."""
+    passed = True
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for metric in ("latency_ms", "ttft_ms"):
+        for q, value in results[metric].items():
+            before = baseline["results"].get(metric, {}).get(q)
+            if value is None or not before:
+                continue
+            change = (value - before) / before
+            flag = ""
+            if change > tolerance:
+                flag, passed = "  REGRESSION", False
+            print(f"  {metric} {q}: {before} -> {value} ({change:+.1%}){flag}")
+
+    before = baseline["results"].get("throughput_rps")
+    if before:
+        change = (results["throughput_rps"] - before) / before
+        flag = ""
+        if change < -tolerance:
+            flag, passed = "  REGRESSION", False
+        print(f"  throughput_rps: {before} -> {results['throughput_rps']} ({change:+.1%}){flag}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /chat path against a fake LLM.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests.")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent first.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sessions", type=int, default=50, help="Distinct sessions requests are spread over.")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--stream", action="store_true", help="Use /chat/stream and measure time to first token.")
+    parser.add_argument("--mongo", choices=["mock", "real"], default="mock")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake time to first token, in seconds.")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="Fake tokens per second.")
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression.")
+    args = parser.parse_args()
+
+    prepare_environment(args)
+
+    from app.core.config import load_params
+    from app.services.app_context import AppContext
+    from app.api.fastapi_app import app
+
+    # Tracing would add network calls to every request
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    params = copy.deepcopy(load_params("config/params.yaml"))
+    params["chatbot"]["provider"] = {
+        "name": "fake",
+        "fake": {
+            "latency_seconds": args.llm_latency,
+            "tokens_per_second": args.token_rate,
+            "response_tokens": args.response_tokens,
+            "error_rate": args.error_rate,
+            "seed": args.seed,
+        },
+    }
+    # Used by the app's lifespan instead of the context it would build from params.yaml
+    app.state.context = AppContext(params)
+
+    with AppServer(app) as base_url:
+        results = asyncio.run(drive(base_url, args))
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {name: value for name, value in vars(args).items() if name not in ("save", "compare")},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Measure the API's cold start and check it against a budget.
+
+Usage:
+    python -m app.tests.benchmark_startup [--runs 5] [--mongo mock|real]
+        [--import-budget-ms 1000] [--health-budget-ms 2000] [--ready-budget-ms 10000]
+        [--save benchmarks/startup.json]
+
+Reports the import time of ``app.api.fastapi_app`` (median over ``--runs``
+fresh interpreters, from ``python -X importtime``) with its slowest modules,
+and, for a server started with uvicorn in a subprocess, the time from
+process start until ``/health`` answers (liveness) and until ``/ready``
+answers (readiness). The server uses the fake LLM provider and, with
+``--mongo mock`` (the default), mongomock-motor.
+
+Also fails if importing the app loads any of the heavy modules that are
+meant to load lazily (LangChain, the Gemini SDK, Motor/pymongo, numpy).
+Exits non-zero when a check fails, so it can gate CI.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+
+APP_MODULE = "app.api.fastapi_app"
+
+# Top-level packages that must not be imported with the app module
+LAZY_MODULES = ("langchain_core", "langchain_google_genai", "motor", "pymongo", "numpy")
+
+SERVER_BOOTSTRAP = """
+import os, sys
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+if sys.argv[2] == "mock":
+    import motor.motor_asyncio
+    from mongomock_motor import AsyncMongoMockClient
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+import uvicorn
+uvicorn.run("app.api.fastapi_app:app", host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """Return ``(module, self_us, cumulative_us)`` for each line of ``-X importtime`` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def measure_import() -> tuple:
+    """Import the app in a fresh interpreter; return (milliseconds, modules)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {APP_MODULE}"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {APP_MODULE} failed:\n{result.stderr[-2000:]}")
+    modules = parse_importtime(result.stderr)
+    total_us = next(cumulative for name, _, cumulative in modules if name == APP_MODULE)
+    return total_us / 1000, modules
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def responds_ok(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status == 200
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return False
+
+
+def measure_server(mongo: str, timeout: float) -> dict:
+    """Start the server and time how long /health and /ready take to answer."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_BOOTSTRAP, str(port), mongo],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    timings = {"health_ms": None, "ready_ms": None}
+    try:
+        while time.perf_counter() - started < timeout and process.poll() is None:
+            if timings["health_ms"] is None and responds_ok(f"{base_url}/health"):
+                timings["health_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            if timings["health_ms"] is not None and responds_ok(f"{base_url}/ready"):
+                timings["ready_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                break
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return timings
+
+
+def check(name: str, value, budget: float) -> bool:
+    passed = value is not None and value <= budget
+    print(f"  {name}: {value} ms (budget {budget} ms){'' if passed else '  OVER BUDGET'}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import and start-up time against a budget.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters used to time the import.")
+    parser.add_argument("--mongo", choices=["mock", "real"], default="mock")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list.")
+    parser.add_argument("--import-budget-ms", type=float, default=1000)
+    parser.add_argument("--health-budget-ms", type=float, default=2000)
+    parser.add_argument("--ready-budget-ms", type=float, default=10000)
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    import_times = []
+    for _ in range(args.runs):
+        milliseconds, modules = measure_import()
+        import_times.append(milliseconds)
+
+    loaded = {name.split(".")[0] for name, _, _ in modules}
+    eager = sorted(name for name in LAZY_MODULES if name in loaded)
+    slowest = sorted(modules, key=lambda module: module[1], reverse=True)[:args.top]
+    server = measure_server(args.mongo, timeout=args.ready_budget_ms / 1000 * 3)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "import_ms": round(statistics.median(import_times), 1),
+        "import_runs_ms": [round(value, 1) for value in import_times],
+        "slowest_modules_ms": {name: round(self_us / 1000, 1) for name, self_us, _ in slowest},
+        "eager_heavy_modules": eager,
+        **server,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    print("\nStart-up budget:")
+    passed = all([
+        check("import", report["import_ms"], args.import_budget_ms),
+        check("health", report["health_ms"], args.health_budget_ms),
+        check("ready", report["ready_ms"], args.ready_budget_ms),
+    ])
+    if eager:
+        passed = False
+        print(f"  imported eagerly: {', '.join(eager)}")
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Local stand-in for the Gemini REST API, for exercising the client stack offline.
+
+Usage:
+    python -m app.tests.fake_llm_server [--port 8765]
+
+Point the backend at it with ``GEMINI_BASE_URL=http://127.0.0.1:8765``. The
+server answers ``generateContent`` and ``streamGenerateContent`` for any
+model. ``POST /control`` changes its behaviour, e.g.
+``{"fail_next": 3}`` makes the next three calls return 503 and
+``{"delays": [2.0]}`` makes the next call take two seconds.
+"""
+import json
+import asyncio
+import argparse
+import threading
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class FakeState:
+    """Behaviour of the fake server, shared by all requests."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.fail_next = 0
+        self.fail_status = 503
+        self.delays = []
+        self.default_delay = 0.0
+
+    def next_delay(self) -> float:
+        return self.delays.pop(0) if self.delays else self.default_delay
+
+
+state = FakeState()
+app = FastAPI(title="Fake Gemini API")
+
+
+def _candidate(text: str) -> dict:
+    return {
+        "candidates": [
+            {"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}
+        ],
+        "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2},
+    }
+
+
+async def _simulate():
+    """Apply the configured delay and failure; returns an error response or None."""
+    state.calls += 1
+    number = state.calls
+    await asyncio.sleep(state.next_delay())
+    if state.fail_next > 0:
+        state.fail_next -= 1
+        return number, JSONResponse(
+            status_code=state.fail_status,
+            content={"error": {"code": state.fail_status, "message": "Simulated failure.", "status": "UNAVAILABLE"}},
+        )
+    return number, None
+
+
+@app.post("/control")
+async def control(request: Request) -> dict:
+    changes = await request.json()
+    if changes.pop("reset", False):
+        state.reset()
+    for name, value in changes.items():
+        setattr(state, name, value)
+    return {"calls": state.calls}
+
+
+@app.post("/{version}/models/{model}:generateContent")
+async def generate_content(version: str, model: str):
+    number, error = await _simulate()
+    return error or _candidate(f"fake answer {number} from {model}")
+
+
+@app.post("/{version}/models/{model}:streamGenerateContent")
+async def stream_generate_content(version: str, model: str):
+    number, error = await _simulate()
+    if error:
+        return error
+
+    async def events():
+        for word in f"fake answer {number} from {model}".split(" "):
+            yield f"data: {json.dumps(_candidate(word + ' '))}\r\n\r\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+class FakeLLMServer:
+    """Runs the fake server on a background thread (for scripts and smoke tests)."""
+
+    def __init__(self, port: int = 8765):
+        self.port = port
+        self.base_url = f"http://127.0.0.1:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            threading.Event().wait(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake Gemini API.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
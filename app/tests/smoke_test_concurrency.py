@@ -0,0 +1,221 @@
+"""
+Exercise the in-process concurrency helpers: request coalescing, per-session
+locks, the write-behind queue and the session history cache.
+
+Usage:
+    python -m app.tests.smoke_test_concurrency
+"""
+import sys
+import asyncio
+
+from pymongo.errors import AutoReconnect, BulkWriteError, OperationFailure
+
+from app.db.history_cache import SessionHistoryCache
+from app.db.write_behind import DUPLICATE_KEY_ERROR, WriteBehindQueue
+from app.services.session_locks import SessionLocks
+from app.services.single_flight import SingleFlight
+
+
+def check(name: str, ok: bool, detail: str = "") -> bool:
+    print(f"{'PASS' if ok else 'FAIL'}: {name} {detail}")
+    return ok
+
+
+def turn(i: int, size: int = 10) -> dict:
+    return {"turn_id": i, "seq": i, "user_input": "q" * size, "chatbot_response": "a" * size}
+
+
+async def single_flight_checks() -> list:
+    results = []
+    flight = SingleFlight()
+    calls = 0
+
+    async def answer():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return f"answer {calls}"
+
+    # Concurrent identical calls share one execution and one result
+    answers = await asyncio.gather(*(flight.do("key", answer) for _ in range(5)))
+    results.append(check("single flight coalesces", calls == 1 and set(answers) == {"answer 1"},
+                         f"(calls={calls}, coalesced={flight.coalesced}, in_flight={flight.in_flight()})"))
+
+    # A failure reaches every caller waiting on it
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("boom")
+
+    outcomes = await asyncio.gather(*(flight.do("fail", fail) for _ in range(3)), return_exceptions=True)
+    results.append(check("single flight shares errors",
+                         all(isinstance(outcome, RuntimeError) for outcome in outcomes)))
+
+    # A cancelled caller stops waiting but the others still get the answer...
+    calls = 0
+    first = asyncio.create_task(flight.do("cancel", answer))
+    second = asyncio.create_task(flight.do("cancel", answer))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    answer_after_cancel = await second
+    results.append(check("single flight survives a cancelled caller",
+                         first.cancelled() and answer_after_cancel == "answer 1"))
+
+    # ...and the shared call is cancelled once nobody waits for it
+    started = asyncio.Event()
+    finished = False
+
+    async def slow():
+        nonlocal finished
+        started.set()
+        await asyncio.sleep(1)
+        finished = True
+
+    waiters = [asyncio.create_task(flight.do("abandoned", slow)) for _ in range(2)]
+    await started.wait()
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+    results.append(check("single flight cancels abandoned calls",
+                         not finished and flight.in_flight() == 0, f"(in_flight={flight.in_flight()})"))
+    return results
+
+
+async def session_lock_checks() -> list:
+    results = []
+    locks = SessionLocks()
+    running = {"a": 0, "b": 0}
+    overlap = {"a": 0, "b": 0}
+
+    async def turn_for(session_id: str):
+        async with locks.hold(session_id):
+            running[session_id] += 1
+            overlap[session_id] = max(overlap[session_id], running[session_id])
+            await asyncio.sleep(0.02)
+            running[session_id] -= 1
+
+    # Turns of one session run one at a time; other sessions are not blocked
+    started = asyncio.get_running_loop().time()
+    await asyncio.gather(*(turn_for("a") for _ in range(3)), *(turn_for("b") for _ in range(3)))
+    elapsed = asyncio.get_running_loop().time() - started
+    results.append(check("session locks serialize a session",
+                         overlap == {"a": 1, "b": 1} and elapsed < 0.1,
+                         f"(elapsed={elapsed:.2f}s, locks left={len(locks)})"))
+
+    # A request cancelled while waiting leaves the holder alone and the lock is cleaned up
+    release = asyncio.Event()
+    order = []
+
+    async def holder():
+        async with locks.hold("c"):
+            order.append("holder")
+            await release.wait()
+
+    async def waiter():
+        async with locks.hold("c"):
+            order.append("waiter")
+
+    holding = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(waiter())
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+    waiters_after_cancel = len(locks)
+    release.set()
+    await holding
+    results.append(check("session locks handle cancelled waiters",
+                         order == ["holder"] and waiters_after_cancel == 1 and len(locks) == 0,
+                         f"(order={order}, locks left={len(locks)})"))
+    return results
+
+
+async def write_behind_checks() -> list:
+    results = []
+    stored = {}
+    attempts = 0
+
+    async def flaky_flush(documents: list):
+        # The first attempt writes the batch but loses the reply; the retry then hits duplicates
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            stored.update({doc["_id"]: doc for doc in documents})
+            raise AutoReconnect("connection reset")
+        raise BulkWriteError({"writeErrors": [
+            {"index": i, "code": DUPLICATE_KEY_ERROR, "errmsg": "duplicate key"}
+            for i, doc in enumerate(documents) if doc["_id"] in stored
+        ]})
+
+    queue = WriteBehindQueue(flaky_flush, flush_interval_seconds=0.01, retry_backoff_seconds=0.01)
+    for i in range(3):
+        await queue.put({"_id": i, "session_id": "s", "user_input": "q", "chatbot_response": "a"})
+    pending_before = len(queue.pending("s"))
+    await queue.flush()
+    results.append(check("write-behind treats duplicate keys on retry as written",
+                         queue.flushed == 3 and queue.dropped == 0 and len(stored) == 3,
+                         f"(attempts={attempts}, flushed={queue.flushed}, dropped={queue.dropped})"))
+    results.append(check("write-behind tracks pending turns",
+                         pending_before == 3 and queue.pending("s") == [],
+                         f"(before={pending_before}, after={len(queue.pending('s'))})"))
+    await queue.close()
+
+    # Errors that are not transient are not retried
+    calls = 0
+
+    async def broken_flush(documents: list):
+        nonlocal calls
+        calls += 1
+        raise OperationFailure("not authorized")
+
+    queue = WriteBehindQueue(broken_flush, flush_interval_seconds=0.01)
+    await queue.put({"_id": 0, "session_id": "s", "user_input": "q", "chatbot_response": "a"})
+    await queue.close()
+    results.append(check("write-behind drops on permanent errors", calls == 1 and queue.dropped == 1,
+                         f"(calls={calls}, dropped={queue.dropped})"))
+    return results
+
+
+async def history_cache_checks() -> list:
+    results = []
+
+    # The least recently used session is evicted first
+    cache = SessionHistoryCache(max_sessions=2, ttl_seconds=60)
+    cache.put("a", [turn(1)], complete=True)
+    cache.put("b", [turn(1)], complete=True)
+    cache.get("a", 1)
+    cache.put("c", [turn(1)], complete=True)
+    results.append(check("history cache evicts by LRU",
+                         cache.get("b", 1) is None and cache.get("a", 1) is not None and len(cache) == 2))
+
+    # Entries expire after the TTL
+    cache = SessionHistoryCache(ttl_seconds=0.05)
+    cache.put("a", [turn(1)], complete=True)
+    hit_before = cache.get("a", 1) is not None
+    await asyncio.sleep(0.06)
+    results.append(check("history cache expires entries", hit_before and cache.get("a", 1) is None
+                         and cache.size_bytes == 0, f"(bytes={cache.size_bytes})"))
+
+    # Large sessions push older ones out once the byte budget is exceeded
+    cache = SessionHistoryCache(max_bytes=10_000, ttl_seconds=60)
+    for session_id in ("a", "b", "c"):
+        cache.put(session_id, [turn(i, size=1000) for i in range(2)], complete=True)
+    results.append(check("history cache evicts by size",
+                         cache.get("a", 1) is None and cache.size_bytes <= 10_000 and len(cache) == 2,
+                         f"(bytes={cache.size_bytes}, sessions={len(cache)})"))
+    return results
+
+
+async def run() -> bool:
+    results = []
+    results += await single_flight_checks()
+    results += await session_lock_checks()
+    results += await write_behind_checks()
+    results += await history_cache_checks()
+    return all(results)
+
+
+if __name__ == "__main__":
+    passed = asyncio.run(run())
+    print("All concurrency checks passed" if passed else "Some concurrency checks failed")
+    sys.exit(0 if passed else 1)
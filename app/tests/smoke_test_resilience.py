@@ -0,0 +1,105 @@
+"""
+Exercise retries, hedging and the circuit breaker against the local fake Gemini API.
+
+Usage:
+    python -m app.tests.smoke_test_resilience
+"""
+import sys
+import time
+import asyncio
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+from app.services.llm_registry import LLMRegistry
+from app.services.llm_providers import GeminiProvider
+from app.services.resilience import CircuitOpenError, ResilientCaller
+from app.services.model_router import ModelRouter
+from app.tests.fake_llm_server import FakeLLMServer, state
+
+MODEL = "gemini-2.5-flash"
+FALLBACK = "gemini-2.5-flash-lite"
+INPUT = {"input": "Hi"}
+
+
+def check(name: str, ok: bool, detail: str = "") -> bool:
+    print(f"{'PASS' if ok else 'FAIL'}: {name} {detail}")
+    return ok
+
+
+async def run(base_url: str) -> bool:
+    prompt = ChatPromptTemplate.from_messages([("user", "{input}")])
+    provider = GeminiProvider(api_key="fake-key", max_retries=1, base_url=base_url)
+    registry = LLMRegistry(provider, prompt, StrOutputParser())
+    chain = registry.get_chain(MODEL)
+    results = []
+
+    try:
+        # Transient 503s are retried until the call succeeds
+        state.reset()
+        state.fail_next = 2
+        caller = ResilientCaller(max_attempts=3, base_delay_seconds=0.05)
+        answer = await caller.call(MODEL, lambda: chain.ainvoke(INPUT))
+        results.append(check("retry after 503", answer.startswith("fake answer 3"),
+                             f"(calls={state.calls}, retries={caller.retries})"))
+
+        # Streams are retried while no chunk has been produced yet
+        state.reset()
+        state.fail_next = 1
+        chunks = [chunk async for chunk in caller.stream(MODEL, lambda: chain.astream(INPUT))]
+        results.append(check("stream retry", "".join(chunks).startswith("fake answer 2"), f"(calls={state.calls})"))
+
+        # A slow first request is overtaken by the hedged one
+        state.reset()
+        state.delays = [2.0]
+        caller = ResilientCaller(hedge_enabled=True, hedge_delay_seconds=0.2)
+        started = time.monotonic()
+        answer = await caller.call(MODEL, lambda: chain.ainvoke(INPUT))
+        elapsed = time.monotonic() - started
+        results.append(check("hedged request", elapsed < 1.5 and caller.hedge_wins == 1,
+                             f"(elapsed={elapsed:.2f}s, answer={answer!r})"))
+
+        # An outage opens the circuit and later calls fail without reaching the server
+        state.reset()
+        state.fail_next = 100
+        caller = ResilientCaller(max_attempts=2, base_delay_seconds=0.01, failure_threshold=4, reset_timeout_seconds=60)
+        for _ in range(2):
+            try:
+                await caller.call(MODEL, lambda: chain.ainvoke(INPUT))
+            except Exception:
+                pass
+        calls_when_open = state.calls
+        try:
+            await caller.call(MODEL, lambda: chain.ainvoke(INPUT))
+            short_circuited = False
+        except CircuitOpenError:
+            short_circuited = True
+        results.append(check("circuit opens", short_circuited and state.calls == calls_when_open,
+                             f"(calls={state.calls}, state={caller.breaker(MODEL).state})"))
+
+        # The router sends traffic to the fallback while the circuit is open...
+        router = ModelRouter(fallbacks={MODEL: [FALLBACK]}, is_open=lambda model: caller.breaker(model).is_open())
+        routed_while_open = router.route(MODEL)
+
+        # ...and back to the model once its trial call is due
+        state.reset()
+        caller.breaker(MODEL).opened_at -= 60
+        routed_after_timeout = router.route(MODEL)
+        results.append(check("router returns after reset timeout",
+                             routed_while_open == FALLBACK and routed_after_timeout == MODEL,
+                             f"(open={routed_while_open}, after={routed_after_timeout})"))
+
+        # After the reset timeout a successful trial call closes the circuit
+        answer = await caller.call(MODEL, lambda: chain.ainvoke(INPUT))
+        results.append(check("circuit recovers", caller.breaker(MODEL).state == "closed", f"(answer={answer!r})"))
+    finally:
+        await registry.close()
+
+    return all(results)
+
+
+if __name__ == "__main__":
+    with FakeLLMServer() as server:
+        passed = asyncio.run(run(server.base_url))
+    print("All resilience checks passed" if passed else "Some resilience checks failed")
+    sys.exit(0 if passed else 1)
@@ -1,6 +1,8 @@
 import os
+import json
 import uuid
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
 from dotenv import load_dotenv
 
@@ -15,6 +17,52 @@ if not API_URL:
 
 if not API_URL.endswith("/chat"):
     API_URL = f"{API_URL.rstrip('/')}/chat"
+STREAM_API_URL = f"{API_URL}/stream"
+
+# Stream tokens from /chat/stream unless explicitly disabled
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() in ("1", "true", "yes")
+
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Create one pooled HTTP session shared across Streamlit reruns."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class StreamError(Exception):
+    """Raised when the backend reports an error mid-stream."""
+
+
+def stream_reply(response: requests.Response):
+    """Yield tokens from a server-sent event stream as they arrive."""
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            event = None
+            continue
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data = json.loads(line[len("data:"):].strip())
+            if event == "error":
+                raise StreamError(data.get("detail", "Unknown streaming error."))
+            if event == "done":
+                return
+            yield data.get("token", "")
+
+
+def show_error(response: requests.Response):
+    """Display a backend error response."""
+    try:
+        err_detail = response.json().get("detail", response.text)
+    except Exception:
+        err_detail = response.text
+    st.error(f"Server error [{response.status_code}]: {err_detail}")
+
 
 # Streamlit Page Setup
 st.set_page_config(page_title="LLM Chatbot", page_icon="🤖", layout="wide")
@@ -41,30 +89,41 @@ if user_input := st.chat_input("Ask your question..."):
         "session_id": session_id,
     }
 
+    http = get_http_session()
+
     try:
-        with st.spinner("Thinking..."):
-            response = requests.post(API_URL, json=payload, timeout=60)
-
-        if response.status_code == 200:
-            try:
-                data = response.json()
-            except ValueError:
-                st.error("Backend returned non-JSON response.")
-                st.stop()
-
-            bot_reply = data.get("response", "No response received.")
-            st.chat_message("user").write(user_input)
-            st.chat_message("assistant").write(bot_reply)
-
-            st.session_state["history"].append({"role": "user", "content": user_input})
-            st.session_state["history"].append({"role": "assistant", "content": bot_reply})
+        if STREAM_RESPONSES:
+            with http.post(STREAM_API_URL, json=payload, stream=True, timeout=(10, 60)) as response:
+                if response.status_code == 200:
+                    st.chat_message("user").write(user_input)
+                    bot_reply = st.chat_message("assistant").write_stream(stream_reply(response))
+
+                    st.session_state["history"].append({"role": "user", "content": user_input})
+                    st.session_state["history"].append({"role": "assistant", "content": bot_reply})
+                else:
+                    show_error(response)
         else:
-            try:
-                err_detail = response.json().get("detail", response.text)
-            except Exception:
-                err_detail = response.text
-            st.error(f"Server error [{response.status_code}]: {err_detail}")
+            with st.spinner("Thinking..."):
+                response = http.post(API_URL, json=payload, timeout=60)
+
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                except ValueError:
+                    st.error("Backend returned non-JSON response.")
+                    st.stop()
+
+                bot_reply = data.get("response", "No response received.")
+                st.chat_message("user").write(user_input)
+                st.chat_message("assistant").write(bot_reply)
+
+                st.session_state["history"].append({"role": "user", "content": user_input})
+                st.session_state["history"].append({"role": "assistant", "content": bot_reply})
+            else:
+                show_error(response)
 
+    except StreamError as e:
+        st.error(f"Server error while streaming: {e}")
     except requests.exceptions.RequestException as e:
         st.error(f"Connection error: {e}")
 